@@ -1,12 +1,14 @@
 import os
 from flask import Flask, render_template
 from flask_restx import Api
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 from config import config
+from app.hashing import PasswordHasher
+from app.persistence.engine import apply_sqlite_pragmas, engine_options
+from app.persistence.slow_query import enable_slow_query_log
 
-bcrypt = Bcrypt()
+password_hasher = PasswordHasher()
 jwt = JWTManager()
 db = SQLAlchemy()
 
@@ -22,10 +24,19 @@ def create_app(config_class="development"):
     app.config.from_object(config_class)
 
     app.config['JWT_SECRET_KEY'] = app.config['SECRET_KEY']
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
 
-    bcrypt.init_app(app)
+    password_hasher.init_app(app)
     jwt.init_app(app)
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS'))
+        enable_slow_query_log(
+            db.engine, app.config.get('SLOW_QUERY_THRESHOLD_MS')
+        )
+
+    from app.commands import hbnb_cli
+    app.cli.add_command(hbnb_cli)
 
     @app.route('/')
     @app.route('/index')
@@ -60,6 +71,18 @@ def create_app(config_class="development"):
     api.add_namespace(places_ns, path='/api/v1/places')
     api.add_namespace(auth_ns, path='/api/v1/auth')
 
+    from app.services import facade
+    facade.init_app(app)
+
+    from app.api import identity
+    identity.init_app(app)
+
+    from app import instrumentation
+    instrumentation.init_app(app)
+
+    from app import metrics
+    metrics.init_app(app)
+
     with app.app_context():
     # print("\n=== Routes enregistrées ===")
     # for rule in app.url_map.iter_rules():
@@ -0,0 +1,60 @@
+import hashlib
+from datetime import timezone
+from flask import Response, request
+from werkzeug.http import http_date
+
+
+def make_etag(*parts):
+    """Build a strong entity tag from the parts identifying a representation"""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def collection_etag(version, *parts):
+    """Entity tag of a collection from its (count, latest updated_at) version
+
+    Extra parts such as the query string tell apart the pages and filtered
+    views of the same collection. Collections are validated by this tag
+    only, never by Last-Modified: deleting any row but the newest leaves
+    the latest updated_at unchanged, the count catches it.
+    """
+    count, last_updated = version
+    return make_etag(count, last_updated.isoformat() if last_updated else '',
+                     *parts)
+
+
+def _to_http_precision(moment):
+    """Convert a naive UTC datetime to the second precision of HTTP dates"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.replace(microsecond=0)
+
+
+def conditional_get(etag, last_modified=None, vary=None):
+    """Evaluate the conditional headers of the current GET request.
+
+    Returns a (response, headers) pair: response is a ready 304 response
+    when the client's copy is still fresh, None otherwise; headers holds
+    the ETag and Last-Modified validators to send with the full body.
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    vary names the request headers the representation depends on; it is
+    sent with the 304 as well, so caches key both answers the same way.
+    """
+    # no-cache lets clients store the body but revalidate before reusing it
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if vary is not None:
+        headers['Vary'] = vary
+    if last_modified is not None:
+        last_modified = _to_http_precision(last_modified)
+        headers['Last-Modified'] = http_date(last_modified)
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+
+    if fresh:
+        return Response(status=304, headers=headers), headers
+    return None, headers
@@ -0,0 +1,50 @@
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from app.services import facade
+
+
+class Identity:
+    """The authenticated caller of the current request"""
+
+    def __init__(self, user_id, is_admin):
+        self.user_id = user_id
+        self.is_admin = is_admin
+
+
+def _forget_identity(exc=None):
+    # g outlives the request when an application context was pushed
+    # beforehand (CLI commands, tests), so drop the identity explicitly
+    g.pop('identity', None)
+
+
+def init_app(app):
+    app.teardown_request(_forget_identity)
+
+
+def current_identity():
+    """Return the Identity of the request's JWT, or None for unknown users.
+
+    Built once per request from the token claims. The database only
+    overrides the is_admin claim when the user's privileges changed after
+    the token was issued; the privilege record itself comes from a
+    short-lived cache in the facade. Must be called from a handler
+    protected by jwt_required().
+    """
+    if 'identity' in g:
+        return g.identity
+
+    user_id = get_jwt_identity()
+    claims = get_jwt()
+    privileges = facade.get_user_privileges(user_id)
+    if privileges is None:
+        identity = None
+    else:
+        changed_at = privileges['privileges_changed_at']
+        if changed_at is not None and claims.get('iat', 0) < changed_at:
+            is_admin = privileges['is_admin']
+        else:
+            is_admin = bool(claims.get('is_admin', False))
+        identity = Identity(user_id, is_admin)
+
+    g.identity = identity
+    return identity
@@ -0,0 +1,32 @@
+import json
+from flask import Response, request, stream_with_context
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """Tell whether the client prefers NDJSON over a JSON array"""
+    best = request.accept_mimetypes.best_match(
+        ['application/json', NDJSON_MIMETYPE]
+    )
+    return best == NDJSON_MIMETYPE
+
+
+def ndjson_response(records, headers=None):
+    """Stream records as newline-delimited JSON, one line per record.
+
+    Records are serialized as the generator produces them, so only one of
+    them is held in memory at a time. The request context stays open until
+    the last line is sent.
+    """
+    def generate():
+        for record in records:
+            yield json.dumps(record, separators=(',', ':')) + '\n'
+
+    response = Response(
+        stream_with_context(generate()), mimetype=NDJSON_MIMETYPE,
+        headers=headers
+    )
+    response.vary.add('Accept')
+    return response
@@ -1,10 +1,11 @@
 from flask import request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
-from app.services.facade import HBnBFacade
+from flask_jwt_extended import jwt_required
+from app.services import facade
+from app.api.identity import current_identity
+from app.api.conditional import collection_etag, conditional_get, make_etag
 
 api = Namespace('amenities', description='Amenity operations')
-facade = HBnBFacade()
 
 amenity_model = api.model('Amenity', {
     'name': fields.String(required=True, description='Name of the amenity')
@@ -21,8 +22,8 @@ class AmenityList(Resource):
     @jwt_required()
     def post(self):
         """Create a new amenity (admin only)"""
-        claims = get_jwt()
-        if not claims.get('is_admin', False):
+        identity = current_identity()
+        if not identity or not identity.is_admin:
             return {'error': 'Admin privileges required'}, 403
 
         data = request.get_json()
@@ -43,8 +44,12 @@ class AmenityList(Resource):
     @api.response(200, 'List of amenities retrieved successfully')
     def get(self):
         """Retrieve a list of all amenities"""
-        amenities = facade.get_all_amenities()
-        return [{'id': a.id, 'name': a.name} for a in amenities], 200
+        version = facade.get_amenities_version()
+        not_modified, headers = conditional_get(collection_etag(version))
+        if not_modified:
+            return not_modified
+
+        return facade.list_amenities(), 200, headers
 
 
 @api.route('/<amenity_id>')
@@ -56,7 +61,13 @@ class AmenityResource(Resource):
         amenity = facade.get_amenity(amenity_id)
         if not amenity:
             return {'error': 'Amenity not found'}, 404
-        return {'id': amenity.id, 'name': amenity.name}, 200
+
+        not_modified, headers = conditional_get(
+            make_etag(amenity.id, amenity.updated_at), amenity.updated_at
+        )
+        if not_modified:
+            return not_modified
+        return {'id': amenity.id, 'name': amenity.name}, 200, headers
 
     @api.expect(amenity_model)
     @api.response(200, 'Amenity updated successfully')
@@ -67,8 +78,8 @@ class AmenityResource(Resource):
     @jwt_required()
     def put(self, amenity_id):
         """Update an amenity's name (admin only)"""
-        claims = get_jwt()
-        if not claims.get('is_admin', False):
+        identity = current_identity()
+        if not identity or not identity.is_admin:
             return {'error': 'Admin privileges required'}, 403
 
         data = request.get_json()
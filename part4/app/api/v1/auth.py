@@ -1,14 +1,8 @@
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import (
-    create_access_token,
-    jwt_required,
-    get_jwt_identity,
-    get_jwt
-)
-from app.services.facade import HBnBFacade
-
-
-facade = HBnBFacade()
+from flask_jwt_extended import create_access_token, jwt_required
+from app.services import facade
+from app.api.identity import current_identity
+from app.hashing import PasswordHasherBusy
 
 
 api = Namespace('auth', description='Authentication operations')
@@ -22,15 +16,20 @@ login_model = api.model('Login', {
 @api.route('/login')
 class Login(Resource):
     @api.expect(login_model)
+    @api.response(503, 'Too many password checks in progress')
     def post(self):
         """Authentifie l'utilisateur et retourne un token JWT"""
         credentials = api.payload
 
-        
-        user = facade.get_user_by_email(credentials['email'])
+        try:
+            user = facade.authenticate(
+                credentials['email'], credentials['password']
+            )
+        except PasswordHasherBusy as e:
+            return {'error': str(e)}, 503, {'Retry-After': e.retry_after}
 
         
-        if not user or not user.verify_password(credentials['password']):
+        if not user:
             return {'error': 'Invalid credentials'}, 401
 
         
@@ -47,11 +46,11 @@ class ProtectedResource(Resource):
     @jwt_required()
     def get(self):
         """Endpoint protégé nécessitant un token JWT valide"""
-        user_id = get_jwt_identity()
-        claims = get_jwt()
-        is_admin = claims.get("is_admin", False)
+        identity = current_identity()
+        if not identity:
+            return {'error': 'Unknown user'}, 401
 
         return {
-            'message': f'Hello, user {user_id}',
-            'is_admin': is_admin
+            'message': f'Hello, user {identity.user_id}',
+            'is_admin': identity.is_admin
         }, 200
@@ -1,10 +1,25 @@
+import math
+from datetime import datetime
 from flask import request
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.persistence.pagination import parse_limit
+from app.api.conditional import collection_etag, conditional_get, make_etag
+from app.api.streaming import ndjson_response
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.api.identity import current_identity
 
 api = Namespace('places', description='Place operations')
 
+DEFAULT_RADIUS_KM = 10.0
+# Largest areas a bbox or near search may cover, so that the grid-cell
+# index always narrows the candidates
+MAX_RADIUS_KM = 500.0
+MAX_BBOX_SPAN_DEGREES = 20.0
+
+# Orders of the place listing; bbox and near results are sorted by distance
+SORT_ORDERS = ('created_at', 'rating')
+
 # Models
 user_model = api.model('PlaceUser', {
     'id': fields.String(description='User ID'),
@@ -55,6 +70,83 @@ place_detail_model = api.model('PlaceDetail', {
 })
 
 
+def parse_price(value, name):
+    """Validate an optional price bound coming from the query string"""
+    if value is None or value == "":
+        return None
+    try:
+        price = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(price):
+        raise ValueError(f"{name} must be a finite number")
+    if price < 0:
+        raise ValueError(f"{name} cannot be negative")
+    return price
+
+
+def parse_coordinates(value, name, count):
+    """Split a comma-separated list of count numbers"""
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(map(math.isfinite, numbers)):
+        raise ValueError(f"{name} must be {count} comma-separated numbers")
+    return numbers
+
+
+def check_position(latitude, longitude):
+    if not -90 <= latitude <= 90:
+        raise ValueError("Latitude must be between -90 and 90")
+    if not -180 <= longitude <= 180:
+        raise ValueError("Longitude must be between -180 and 180")
+
+
+def parse_bbox(value):
+    """Validate a south,west,north,east bounding box"""
+    south, west, north, east = parse_coordinates(value, 'bbox', 4)
+    check_position(south, west)
+    check_position(north, east)
+    if south > north:
+        raise ValueError("bbox south edge cannot be north of its north edge")
+    width = east - west if west <= east else east - west + 360
+    if max(north - south, width) > MAX_BBOX_SPAN_DEGREES:
+        raise ValueError(
+            f"bbox cannot span more than {MAX_BBOX_SPAN_DEGREES:g} degrees"
+        )
+    return south, west, north, east
+
+
+def parse_sort(value):
+    if value is None or value == "":
+        return None
+    if value not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_ORDERS)}")
+    return value
+
+
+def parse_names(value):
+    """Split a comma-separated list of names, None when the parameter is absent"""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_radius(value):
+    if value is None or value == "":
+        return DEFAULT_RADIUS_KM
+    try:
+        radius_km = float(value)
+    except ValueError:
+        raise ValueError("radius_km must be a number")
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(
+            f"radius_km must be between 0 and {MAX_RADIUS_KM:g}"
+        )
+    return radius_km
+
+
 @api.route('/')
 class PlaceList(Resource):
     @api.expect(place_input_model)
@@ -93,22 +185,152 @@ class PlaceList(Resource):
         except ValueError as e:
             return {'error': str(e)}, 400
 
+    @api.doc(params={
+        'limit': 'Maximum number of places per page (default 20, max 100)',
+        'cursor': 'Cursor returned as next_cursor by the previous page',
+        'min_price': 'Lowest price per night (inclusive)',
+        'max_price': 'Highest price per night (inclusive)',
+        'bbox': 'Bounding box as south,west,north,east in degrees, '
+                'at most 20 degrees on each side',
+        'near': 'Position as lat,lng; results are sorted by distance',
+        'radius_km': 'Search radius around near, in km (default 10, '
+                     'max 500)',
+        'sort': 'created_at (default) or rating, best average rating first'
+    })
     @api.response(200, 'List of places retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
+    def get(self):
+        """Retrieve a page of places ordered by creation date or rating"""
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            min_price = parse_price(request.args.get('min_price'), 'min_price')
+            max_price = parse_price(request.args.get('max_price'), 'max_price')
+            if (min_price is not None and max_price is not None
+                    and min_price > max_price):
+                raise ValueError("min_price cannot be greater than max_price")
+
+            sort = parse_sort(request.args.get('sort'))
+            bbox = request.args.get('bbox')
+            near = request.args.get('near')
+            if bbox and near:
+                raise ValueError("bbox and near cannot be combined")
+            if sort and (bbox or near):
+                raise ValueError("sort cannot be combined with bbox or near")
+            if bbox:
+                bbox = parse_bbox(bbox)
+            if near:
+                latitude, longitude = parse_coordinates(near, 'near', 2)
+                check_position(latitude, longitude)
+                radius_km = parse_radius(request.args.get('radius_km'))
+
+            # Only well-formed requests get a validator, so a cached 304
+            # never masks a 400.
+            version = facade.get_places_version()
+            not_modified, headers = conditional_get(
+                collection_etag(version, request.query_string.decode('utf-8'))
+            )
+            if not_modified:
+                return not_modified
+
+            if bbox:
+                return facade.search_places_in_bbox(
+                    *bbox, limit, request.args.get('cursor'),
+                    min_price=min_price, max_price=max_price
+                ), 200, headers
+            if near:
+                return facade.search_places_nearby(
+                    latitude, longitude, radius_km, limit,
+                    request.args.get('cursor'),
+                    min_price=min_price, max_price=max_price
+                ), 200, headers
+
+            return facade.get_places_page(
+                limit, request.args.get('cursor'),
+                min_price=min_price, max_price=max_price, sort=sort
+            ), 200, headers
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+
+@api.route('/export')
+class PlaceExport(Resource):
+    @api.response(200, 'Places streamed as newline-delimited JSON')
+    @api.produces(['application/x-ndjson'])
     def get(self):
-        """Retrieve a list of all places"""
-        return facade.get_all_places(), 200
+        """Stream every place as newline-delimited JSON"""
+        version = facade.get_places_version()
+        not_modified, headers = conditional_get(
+            collection_etag(version, 'ndjson')
+        )
+        if not_modified:
+            return not_modified
+        return ndjson_response(facade.export_places(), headers)
+
+
+@api.route('/search')
+class PlaceSearch(Resource):
+    @api.doc(params={
+        'q': 'Words to find in place titles, descriptions and reviews',
+        'limit': 'Maximum number of places per page (default 20, max 100)',
+        'cursor': 'Cursor returned as next_cursor by the previous page'
+    })
+    @api.response(200, 'Matching places, best match first')
+    @api.response(400, 'Missing query or invalid pagination parameters')
+    def get(self):
+        """Search places by title, description and review text"""
+        try:
+            return facade.search_places(
+                request.args.get('q', ''),
+                parse_limit(request.args.get('limit')),
+                request.args.get('cursor')
+            ), 200
+        except ValueError as e:
+            return {'error': str(e)}, 400
 
 
 @api.route('/<place_id>')
 class PlaceResource(Resource):
+    @api.doc(params={
+        'fields': 'Comma-separated keys to return (id is always returned)',
+        'include': 'Comma-separated relationships to embed: '
+                   'owner, amenities, reviews (default: all)'
+    })
     @api.response(200, 'Place details retrieved successfully')
+    @api.response(400, 'Invalid fields or include parameter')
     @api.response(404, 'Place not found')
     def get(self, place_id):
         """Get place details by ID"""
-        place = facade.get_place_by_id(place_id)
+        fields = request.args.get('fields')
+        include = request.args.get('include')
+        requested = parse_names(fields)
+        try:
+            place = facade.get_place_by_id(
+                place_id, include=parse_names(include),
+                # updated_at is needed for the validators below
+                fields=None if requested is None else requested + ['updated_at']
+            )
+        except ValueError as e:
+            return {'error': str(e)}, 400
         if not place:
             return {'error': 'Place not found'}, 404
-        return place, 200
+
+        # Writes to the owner, amenities and reviews embedded in the detail
+        # bump the place's updated_at, which therefore versions all of it
+        last_modified = (
+            datetime.fromisoformat(place['updated_at'])
+            if place['updated_at'] else None
+        )
+        parts = [place['id'], place['updated_at']]
+        if fields is not None or include is not None:
+            parts += [fields, include]
+        not_modified, headers = conditional_get(
+            make_etag(*parts), last_modified
+        )
+        if not_modified:
+            return not_modified
+        if requested is not None and 'updated_at' not in requested:
+            place = {k: v for k, v in place.items() if k != 'updated_at'}
+        return place, 200, headers
 
     @api.expect(place_update_model)
     @api.response(200, 'Place updated successfully')
@@ -119,12 +341,16 @@ class PlaceResource(Resource):
     @jwt_required()
     def put(self, place_id):
         """Update a place (only owner or admin)"""
-        user_id = get_jwt_identity()
-        claims = get_jwt()
-        is_admin = claims.get("is_admin", False)
+        identity = current_identity()
+        if not identity:
+            return {'error': 'Unauthorized action'}, 403
+        user_id = identity.user_id
+        is_admin = identity.is_admin
 
         data = request.get_json()
-        existing_place = facade.get_place_by_id(place_id)
+        existing_place = facade.get_place_by_id(
+            place_id, include=(), fields=('owner_id',)
+        )
 
         if not existing_place:
             return {'error': 'Place not found'}, 404
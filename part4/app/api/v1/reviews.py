@@ -1,6 +1,11 @@
+from flask import request
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.persistence.pagination import decode_cursor, parse_limit
+from app.api.conditional import collection_etag, conditional_get, make_etag
+from app.api.streaming import ndjson_response, wants_ndjson
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.api.identity import current_identity
 
 api = Namespace('reviews', description='Review operations')
 
@@ -35,18 +40,18 @@ class ReviewList(Resource):
 
         review_data['user_id'] = current_user
 
-        place = facade.get_place_by_id(review_data.get('place_id'))
+        place = facade.get_place_by_id(
+            review_data.get('place_id'), include=(), fields=('owner_id',)
+        )
         if not place:
             return {'error': 'Place not found'}, 404
 
         if place.get('owner_id') == current_user:
             return {'error': 'You cannot review your own place'}, 400
 
-        all_reviews = facade.get_all_reviews()
-        for review in all_reviews:
-            if (review.user_id == current_user and
-                    review.place_id == review_data.get('place_id')):
-                return {'error': 'You have already reviewed this place'}, 400
+        if facade.has_user_reviewed_place(
+                current_user, review_data.get('place_id')):
+            return {'error': 'You have already reviewed this place'}, 400
 
         errors = []
 
@@ -73,10 +78,42 @@ class ReviewList(Resource):
             api.abort(400, str(e))
 
     @api.response(200, 'List of reviews retrieved successfully')
+    @api.produces(['application/json', 'application/x-ndjson'])
     def get(self):
-        """Retrieve a list of all reviews"""
-        reviews = facade.get_all_reviews()
-        return [review.to_dict() for review in reviews], 200
+        """Retrieve a list of all reviews
+
+        With Accept: application/x-ndjson the reviews are streamed, one
+        JSON object per line.
+        """
+        ndjson = wants_ndjson()
+        version = facade.get_reviews_version()
+        not_modified, headers = conditional_get(
+            collection_etag(version, *(['ndjson'] if ndjson else [])),
+            vary='Accept'
+        )
+        if not_modified:
+            return not_modified
+
+        if ndjson:
+            return ndjson_response(facade.export_reviews(), headers)
+        return facade.list_reviews(), 200, headers
+
+
+@api.route('/export')
+class ReviewExport(Resource):
+    @api.doc(params={'place_id': 'Only export the reviews of this place'})
+    @api.response(200, 'Reviews streamed as newline-delimited JSON')
+    @api.produces(['application/x-ndjson'])
+    def get(self):
+        """Stream every review as newline-delimited JSON"""
+        place_id = request.args.get('place_id') or None
+        version = facade.get_reviews_version(place_id)
+        not_modified, headers = conditional_get(
+            collection_etag(version, 'ndjson', place_id)
+        )
+        if not_modified:
+            return not_modified
+        return ndjson_response(facade.export_reviews(place_id), headers)
 
 
 @api.route('/<review_id>')
@@ -90,7 +127,12 @@ class ReviewResource(Resource):
         if not review:
             api.abort(404, f"Review with id {review_id} not found")
 
-        return review.to_dict(), 200
+        not_modified, headers = conditional_get(
+            make_etag(review.id, review.updated_at), review.updated_at
+        )
+        if not_modified:
+            return not_modified
+        return review.to_dict(), 200, headers
 
     @api.expect(review_update_model)
     @api.response(200, 'Review updated successfully')
@@ -101,9 +143,11 @@ class ReviewResource(Resource):
     @jwt_required()
     def put(self, review_id):
         """Update a review's information (requires authentication)"""
-        current_user = get_jwt_identity()
-
-        is_admin = current_user.get('is_admin', False)
+        identity = current_identity()
+        if not identity:
+            return {'error': 'Unauthorized action'}, 403
+        current_user = identity.user_id
+        is_admin = identity.is_admin
 
         review = facade.get_review(review_id)
 
@@ -145,9 +189,11 @@ class ReviewResource(Resource):
     @jwt_required()
     def delete(self, review_id):
         """Delete a review (requires authentication)"""
-        current_user = get_jwt_identity()
-
-        is_admin = current_user.get('is_admin', False)
+        identity = current_identity()
+        if not identity:
+            return {'error': 'Unauthorized action'}, 403
+        current_user = identity.user_id
+        is_admin = identity.is_admin
 
         review = facade.get_review(review_id)
 
@@ -166,12 +212,34 @@ class ReviewResource(Resource):
 
 @api.route('/places/<place_id>/reviews')
 class PlaceReviewList(Resource):
+    @api.doc(params={
+        'limit': 'Maximum number of reviews per page (default 20, max 100)',
+        'cursor': 'Cursor returned as next_cursor by the previous page'
+    })
     @api.response(200, 'List of reviews for the place retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
     @api.response(404, 'Place not found')
     def get(self, place_id):
-        """Get all reviews for a specific place"""
+        """Get a page of the reviews of a specific place"""
+        cursor = request.args.get('cursor')
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            if cursor:
+                decode_cursor(cursor)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        version = facade.get_reviews_version(place_id)
+        not_modified, headers = conditional_get(
+            collection_etag(
+                version, place_id, request.query_string.decode('utf-8')
+            )
+        )
+        if not_modified:
+            return not_modified
+
         try:
-            reviews = facade.get_reviews_by_place(place_id)
-            return [review.to_dict() for review in reviews], 200
+            page = facade.get_reviews_by_place(place_id, limit, cursor)
+            return page, 200, headers
         except ValueError as e:
             api.abort(404, str(e))
@@ -1,6 +1,8 @@
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app.services import facade
+from app.api.identity import current_identity
+from app.hashing import PasswordHasherBusy
 import re
 
 api = Namespace('users', description='User operations')
@@ -27,6 +29,7 @@ class UserList(Resource):
     @api.expect(user_model, validate=True)
     @api.response(201, 'User successfully created')
     @api.response(400, 'Invalid input or email already exists')
+    @api.response(503, 'Too many password checks in progress')
     def post(self):
         """Create a new user (public access)"""
         user_data = api.payload
@@ -49,7 +52,10 @@ class UserList(Resource):
         if errors:
             return {'error': 'Invalid input data', 'details': errors}, 400
 
-        new_user = facade.create_user(user_data)
+        try:
+            new_user = facade.create_user(user_data)
+        except PasswordHasherBusy as e:
+            return {'error': str(e)}, 503, {'Retry-After': e.retry_after}
         return {
             'id': new_user.id,
             'first_name': new_user.first_name,
@@ -63,20 +69,12 @@ class UserList(Resource):
     @jwt_required()
     def get(self):
         """Get list of all users (admin only)"""
-        user_id = get_jwt_identity()
-        user = facade.get_user(user_id)
+        identity = current_identity()
 
-        if not user or not user.is_admin:
+        if not identity or not identity.is_admin:
             return {'error': 'Admin privileges required'}, 403
 
-        users = facade.user_repo.get_all()
-        return [{
-            'id': u.id,
-            'first_name': u.first_name,
-            'last_name': u.last_name,
-            'email': u.email,
-            'is_admin': u.is_admin
-        } for u in users], 200
+        return facade.list_users(), 200
 
 
 @api.route('/<user_id>')
@@ -87,10 +85,10 @@ class UserResource(Resource):
     @jwt_required()
     def get(self, user_id):
         """Get user details by ID (owner or admin only)"""
-        current_user_id = get_jwt_identity()
-        user = facade.get_user(current_user_id)
+        identity = current_identity()
 
-        if not user or (str(user.id) != str(user_id) and not user.is_admin):
+        if not identity or (str(identity.user_id) != str(user_id)
+                            and not identity.is_admin):
             return {'error': 'Access denied'}, 403
 
         target_user = facade.get_user(user_id)
@@ -105,23 +103,23 @@ class UserResource(Resource):
             'is_admin': target_user.is_admin
         }, 200
 
-    @api.expect(user_update_model)
+    @api.expect(user_update_model, validate=True)
     @api.response(200, 'User updated successfully')
     @api.response(400, 'Invalid input data')
     @api.response(403, 'Unauthorized action')
     @api.response(404, 'User not found')
+    @api.response(503, 'Too many password checks in progress')
     @jwt_required()
     def put(self, user_id):
         """Update user information (owner or admin only)"""
-        current_user_id = get_jwt_identity()
-        user = facade.get_user(current_user_id)
+        identity = current_identity()
         user_data = api.payload
 
-        if not user:
+        if not identity:
             return {'error': 'Unauthorized action'}, 403
 
-        is_admin = user.is_admin
-        is_self = str(user.id) == str(user_id)
+        is_admin = identity.is_admin
+        is_self = str(identity.user_id) == str(user_id)
 
         if not is_self and not is_admin:
             return {'error': 'Unauthorized action'}, 403
@@ -145,7 +143,12 @@ class UserResource(Resource):
         if 'password' in user_data and len(user_data['password']) < 6:
             return {'error': 'Password must be at least 6 characters long'}, 400
 
-        updated_user = facade.update_user(user_id, user_data)
+        try:
+            updated_user = facade.update_user(user_id, user_data)
+        except PasswordHasherBusy as e:
+            return {'error': str(e)}, 503, {'Retry-After': e.retry_after}
+        except ValueError as e:
+            return {'error': str(e)}, 400
         if not updated_user:
             return {'error': 'User not found'}, 404
 
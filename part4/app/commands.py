@@ -0,0 +1,85 @@
+import click
+from flask.cli import AppGroup
+
+
+hbnb_cli = AppGroup('hbnb', help='HBnB maintenance commands.')
+
+
+@hbnb_cli.command('recompute-ratings')
+def recompute_ratings():
+    """Recompute the review count and rating sum of every place."""
+    from app.services import facade
+
+    updated = facade.recompute_rating_aggregates()
+    click.echo(f"Recomputed rating aggregates of {updated} places")
+
+
+@hbnb_cli.command('reindex-search')
+def reindex_search():
+    """Rebuild the place search index from the places and reviews."""
+    from app.services import facade
+
+    facade.rebuild_search_index()
+    click.echo("Rebuilt the place search index")
+
+
+@hbnb_cli.command('import')
+@click.option('--users', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of users.')
+@click.option('--amenities', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of amenities.')
+@click.option('--places', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of places.')
+@click.option('--reviews', type=click.Path(exists=True, dir_okay=False),
+              help='NDJSON or CSV file of reviews.')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']),
+              help='File format, guessed from the extension by default.')
+@click.option('--batch-size', type=click.IntRange(min=1),
+              help='Rows per INSERT batch (default: IMPORT_BATCH_SIZE).')
+@click.option('--show-errors', default=20, show_default=True,
+              help='Rejected records listed per file.')
+def import_records(users, amenities, places, reviews, fmt, batch_size,
+                   show_errors):
+    """Stream records from export files into the database.
+
+    Files are loaded in dependency order (users, amenities, places,
+    reviews), so a file may reference records of the files before it.
+    """
+    from flask import current_app
+    from app.services import facade
+    from app.services.importer import BulkImporter, IMPORT_ORDER
+
+    files = {
+        'users': users, 'amenities': amenities,
+        'places': places, 'reviews': reviews
+    }
+    if not any(files.values()):
+        raise click.UsageError('Give at least one file to import.')
+
+    def progress(report):
+        click.echo(
+            f"  {report.kind}: {report.imported} imported, "
+            f"{report.rejected} rejected ({report.rate:,.0f} rows/s)"
+        )
+
+    importer = BulkImporter(
+        facade,
+        batch_size=batch_size or current_app.config['IMPORT_BATCH_SIZE'],
+        progress=progress
+    )
+    for kind in IMPORT_ORDER:
+        if not files[kind]:
+            continue
+        click.echo(f"Importing {kind} from {files[kind]}")
+        report = importer.import_file(kind, files[kind], fmt)
+        click.echo(
+            f"Imported {report.imported} {kind} in {report.elapsed:.2f}s "
+            f"({report.rate:,.0f} rows/s), {report.rejected} rejected"
+        )
+        for line_no, message in report.errors[:show_errors]:
+            click.echo(f"  line {line_no}: {message}", err=True)
+
+    # Bulk inserts bypass the facade, which keeps the search index current
+    if places or reviews:
+        facade.rebuild_search_index()
+        click.echo("Rebuilt the place search index")
@@ -0,0 +1,124 @@
+import re
+import threading
+import bcrypt as _bcrypt
+
+
+# Seconds a client turned away by a saturated hasher is told to wait
+RETRY_AFTER_SECONDS = 1
+
+# $2b$<cost>$ followed by the 22-character salt and 31-character digest
+_BCRYPT_HASH = re.compile(r'\$2[abxy]?\$(\d{2})\$[./A-Za-z0-9]{53}')
+_BCRYPT_COSTS = range(4, 32)
+
+
+def _hash_password(password, rounds):
+    salt = _bcrypt.gensalt(rounds)
+    return _bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _check_password(password, hashed):
+    try:
+        return _bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:  # not a bcrypt hash
+        return False
+
+
+def is_bcrypt_hash(value):
+    """Tell whether a string is a well-formed bcrypt hash with a valid cost"""
+    match = _BCRYPT_HASH.fullmatch(value)
+    return bool(match) and int(match.group(1)) in _BCRYPT_COSTS
+
+
+class PasswordHasherBusy(Exception):
+    """Raised instead of waiting when every bcrypt worker is taken and the
+    queue is full, or a job waited longer than the configured timeout"""
+
+    def __init__(self):
+        super().__init__("Too many password checks in progress, retry later")
+        self.retry_after = RETRY_AFTER_SECONDS
+
+
+class PasswordHasher:
+    """Bounds how many bcrypt computations run at once.
+
+    bcrypt releases the GIL, so jobs run in the calling thread, up to
+    `workers` of them in parallel; this caps how many CPU cores a burst of
+    logins can take from the other endpoints. At most `max_queue` more
+    jobs wait for a worker, each for at most `timeout` seconds: beyond
+    that the job raises PasswordHasherBusy at once, and the API answers
+    503, instead of holding one more request thread. With zero workers
+    nothing is bounded, which is what the tests and one-off scripts want.
+
+    Configuration keys:
+        BCRYPT_LOG_ROUNDS: bcrypt cost factor of new hashes (default 12)
+        PASSWORD_HASH_WORKERS: bcrypt jobs running at once (default 2)
+        PASSWORD_HASH_MAX_QUEUE: jobs waiting for a worker (default 8)
+        PASSWORD_HASH_TIMEOUT: seconds a job waits for a worker (default 5)
+    """
+
+    def __init__(self, rounds=12, workers=2, max_queue=8, timeout=5.0):
+        self.rounds = rounds
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+        self._set_workers(workers)
+
+    def _set_workers(self, workers):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers) if workers else None
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.max_queue = app.config.get('PASSWORD_HASH_MAX_QUEUE', 8)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 5.0)
+        self._set_workers(app.config.get('PASSWORD_HASH_WORKERS', 2))
+
+    @property
+    def queue_depth(self):
+        """Number of hash or verify jobs running or waiting for a worker"""
+        return self._pending
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise PasswordHasherBusy()
+
+    def _run(self, func, *args):
+        slots = self._slots
+        if slots is None:
+            return func(*args)
+        with self._lock:
+            full = self._pending >= self.workers + self.max_queue
+            if not full:
+                self._pending += 1
+        if full:
+            self._reject()
+        try:
+            if not slots.acquire(timeout=self.timeout):
+                self._reject()
+            try:
+                return func(*args)
+            finally:
+                slots.release()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def hash(self, password):
+        """Return the bcrypt hash of a password at the configured cost"""
+        return self._run(_hash_password, password, self.rounds)
+
+    def verify(self, password, hashed):
+        """Check a password against a stored bcrypt hash"""
+        if not hashed:
+            return False
+        return self._run(_check_password, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """Tell whether a stored hash uses another cost than the configured one"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
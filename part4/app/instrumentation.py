@@ -0,0 +1,151 @@
+import json
+import logging
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from flask.logging import default_handler
+from sqlalchemy import event
+from app import db
+
+
+logger = logging.getLogger('hbnb.requests')
+
+
+class RequestStats:
+    """SQL and facade time spent by the current request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.facade_calls = 0
+        self.facade_time = 0.0
+        self.facade_depth = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_stats():
+    """Return the RequestStats of the running request, None when not measured"""
+    if has_app_context():
+        return g.get('request_stats')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None:
+        context.hbnb_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    stats = current_stats()
+    started = getattr(context, 'hbnb_started', None)
+    if stats is not None and started is not None:
+        stats.sql_count += 1
+        stats.sql_time += time.perf_counter() - started
+
+
+def _timed(method):
+    """Add the duration of a facade call to the request's facade time.
+
+    Only the outermost call is timed, so facade methods calling each other
+    are not counted twice.
+    """
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        stats = current_stats()
+        if stats is None or stats.facade_depth:
+            return method(*args, **kwargs)
+        stats.facade_depth += 1
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats.facade_depth -= 1
+            stats.facade_calls += 1
+            stats.facade_time += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+def _instrument_facade(facade):
+    for name in dir(type(facade)):
+        if name.startswith('_') or name == 'init_app':
+            continue
+        method = getattr(facade, name)
+        if callable(method) and not getattr(method, 'timed', False):
+            setattr(facade, name, _timed(method))
+
+
+def _start_request():
+    g.request_stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = g.pop('request_stats', None)
+    if stats is None:
+        return response
+
+    total_ms = stats.elapsed * 1000
+    sql_ms = stats.sql_time * 1000
+    facade_ms = stats.facade_time * 1000
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={sql_ms:.2f};desc="{stats.sql_count} statements", '
+        f'facade;dur={facade_ms:.2f}, total;dur={total_ms:.2f}'
+    )
+
+    budget = current_app.config.get('SQL_STATEMENT_BUDGET')
+    over_budget = budget is not None and stats.sql_count > budget
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        'sql_statements': stats.sql_count,
+        'sql_ms': round(sql_ms, 2),
+        'facade_calls': stats.facade_calls,
+        'facade_ms': round(facade_ms, 2),
+        'over_statement_budget': over_budget,
+    }
+    if over_budget:
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
+    return response
+
+
+def init_app(app):
+    """Measure every request when REQUEST_INSTRUMENTATION is enabled.
+
+    Each response gets a Server-Timing header with the SQL time and
+    statement count, the time spent in facade calls and the total time,
+    and one JSON line is logged to the "hbnb.requests" logger. Requests
+    running more than SQL_STATEMENT_BUDGET statements are logged as
+    warnings, which catches N+1 regressions. The time a streamed body
+    takes after the headers are sent is not included.
+    """
+    if not app.config.get('REQUEST_INSTRUMENTATION'):
+        return
+
+    from app.services import facade
+    _instrument_facade(facade)
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute',
+                          _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if not logger.handlers:
+        logger.addHandler(default_handler)
+        logger.setLevel(logging.INFO)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,197 @@
+import threading
+import time
+from flask import Response, g, request
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    ) + '}'
+
+
+def _number(value):
+    return 'NaN' if value is None else repr(float(value))
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram, one series per label tuple"""
+
+    label_names = ('namespace', 'resource', 'method', 'status')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # one counter per bucket, then +Inf, sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self, name):
+        lines = []
+        with self._lock:
+            series = {labels: list(values)
+                      for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            named = dict(zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, values):
+                lines.append(
+                    f'{name}_bucket{_labels(**named, le=repr(bound))} {count}'
+                )
+            lines.append(f'{name}_bucket{_labels(**named, le="+Inf")} '
+                         f'{values[-2]}')
+            lines.append(f'{name}_sum{_labels(**named)} {values[-1]!r}')
+            lines.append(f'{name}_count{_labels(**named)} {values[-2]}')
+        return lines
+
+
+class Metrics:
+    """Request, database pool, cache and password hashing metrics"""
+
+    def __init__(self, app):
+        self.app = app
+        self.latency = LatencyHistogram(
+            app.config.get('METRICS_LATENCY_BUCKETS', LATENCY_BUCKETS)
+        )
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _route_labels(self):
+        """(namespace, resource) of the matched route.
+
+        flask-restx endpoints are named <namespace>_<resource>; the view
+        class gives the resource name as written (PlaceList, ...).
+        """
+        endpoint = request.endpoint
+        if endpoint is None:
+            return '', 'unmatched'
+        view = self.app.view_functions.get(endpoint)
+        view_class = getattr(view, 'view_class', None)
+        if view_class is not None and '_' in endpoint:
+            return endpoint.split('_', 1)[0], view_class.__name__
+        return '', endpoint
+
+    def start_request(self):
+        g.metrics_started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+
+    def record_status(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def finish_request(self, exc=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        with self._lock:
+            self.in_flight -= 1
+        status = g.pop('metrics_status', 500)
+        self.latency.observe(
+            self._route_labels() + (request.method, str(status)),
+            time.perf_counter() - started
+        )
+
+    def render(self):
+        from app import db, password_hasher
+        from app.services import facade
+
+        lines = [
+            '# HELP hbnb_http_request_duration_seconds Request latency by '
+            'flask-restx namespace and resource.',
+            '# TYPE hbnb_http_request_duration_seconds histogram',
+            *self.latency.render('hbnb_http_request_duration_seconds'),
+            '# HELP hbnb_http_requests_in_flight Requests being served.',
+            '# TYPE hbnb_http_requests_in_flight gauge',
+            f'hbnb_http_requests_in_flight {self.in_flight}',
+        ]
+
+        pool = db.engine.pool
+        for name, method, help_text in (
+            ('size', 'size', 'Connections kept open by the pool.'),
+            ('checked_out', 'checkedout', 'Connections in use.'),
+            ('overflow', 'overflow', 'Connections opened beyond the pool '
+                                     'size.'),
+        ):
+            # Only QueuePool keeps these counters, not the SQLite pools
+            if hasattr(pool, method):
+                # QueuePool.overflow() is negative until the pool is full
+                value = max(getattr(pool, method)(), 0)
+                lines += [
+                    f'# HELP hbnb_db_pool_{name} {help_text}',
+                    f'# TYPE hbnb_db_pool_{name} gauge',
+                    f'hbnb_db_pool_{name} {value}',
+                ]
+
+        caches = facade.get_cache_stats()
+        lines += [
+            '# HELP hbnb_cache_hits_total Cache lookups that found a value.',
+            '# TYPE hbnb_cache_hits_total counter',
+            *[f'hbnb_cache_hits_total{_labels(cache=name)} {stats["hits"]}'
+              for name, stats in caches.items()],
+            '# HELP hbnb_cache_misses_total Cache lookups that found nothing.',
+            '# TYPE hbnb_cache_misses_total counter',
+            *[f'hbnb_cache_misses_total{_labels(cache=name)} '
+              f'{stats["misses"]}' for name, stats in caches.items()],
+            '# HELP hbnb_cache_hit_ratio Hits over lookups since start.',
+            '# TYPE hbnb_cache_hit_ratio gauge',
+            *[f'hbnb_cache_hit_ratio{_labels(cache=name)} '
+              f'{_number(stats["hit_ratio"])}'
+              for name, stats in caches.items()],
+            '# HELP hbnb_password_hash_queue_depth bcrypt jobs running or '
+            'waiting for a worker.',
+            '# TYPE hbnb_password_hash_queue_depth gauge',
+            f'hbnb_password_hash_queue_depth {password_hasher.queue_depth}',
+            '# HELP hbnb_password_hash_workers bcrypt jobs allowed to run '
+            'at once.',
+            '# TYPE hbnb_password_hash_workers gauge',
+            f'hbnb_password_hash_workers {password_hasher.workers}',
+            '# HELP hbnb_password_hash_rejected_total bcrypt jobs turned '
+            'away with a 503.',
+            '# TYPE hbnb_password_hash_rejected_total counter',
+            f'hbnb_password_hash_rejected_total {password_hasher.rejected}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Serve the metrics of this process at /metrics in Prometheus format.
+
+    Disabled when METRICS_ENABLED is false. Each worker process keeps its
+    own counters, so every worker has to be scraped.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    metrics = Metrics(app)
+    app.extensions['hbnb_metrics'] = metrics
+
+    app.before_request(metrics.start_request)
+    app.after_request(metrics.record_status)
+    app.teardown_request(metrics.finish_request)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
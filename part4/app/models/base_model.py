@@ -1,4 +1,5 @@
 from app import db
+from app.persistence.unit_of_work import commit_or_flush
 import uuid
 from datetime import datetime
 
@@ -14,10 +15,14 @@ class BaseModel(db.Model):
     )
 
     def save(self):
-        """Updates the modification timestamp and saves to the database"""
+        """Updates the modification timestamp and saves to the database
+
+        Inside a UnitOfWork the change is only flushed, the unit of work
+        commits it.
+        """
         self.updated_at = datetime.utcnow()
         db.session.add(self)
-        db.session.commit()
+        commit_or_flush()
 
     def update(self, data):
         """Updates the object's attributes based on the provided dictionary"""
@@ -1,6 +1,8 @@
 from app import db
+from sqlalchemy import Float, cast, func, literal_column
 from sqlalchemy.orm import validates, relationship
 from .base_model import BaseModel
+from app.persistence.geo import grid_cell
 
 
 place_amenity = db.Table(
@@ -10,14 +12,50 @@ place_amenity = db.Table(
 )
 
 
+# Place columns read by Place.summary_from_row
+SUMMARY_COLUMNS = (
+    'id', 'title', 'description', 'price', 'latitude', 'longitude',
+    'review_count', 'rating_sum'
+)
+
+
+def average_rating(review_count, rating_sum):
+    if not review_count:
+        return None
+    return round(rating_sum / review_count, 2)
+
+
+# Keys of Place.to_detail_dict filled from each embeddable relationship
+DETAIL_EMBEDS = {
+    'owner': ('owner', 'owner_name'),
+    'amenities': ('amenities',),
+    'reviews': ('reviews',),
+}
+
+
 class Place(BaseModel):
     __tablename__ = 'places'
+    __table_args__ = (
+        db.Index('ix_places_created_at_id', 'created_at', 'id'),
+        db.Index('ix_places_price', 'price'),
+        db.Index('ix_places_grid_cell', 'grid_cell'),
+        db.Index('ix_places_owner_id', 'owner_id'),
+    )
 
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     price = db.Column(db.Float, nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
+    # Spatial index key, kept in sync by the coordinate validators
+    grid_cell = db.Column(db.Integer, nullable=True)
+    # Denormalized review aggregates, maintained by the facade
+    review_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0'
+    )
+    rating_sum = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0'
+    )
 
     owner_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)
     owner = relationship('User', back_populates='places')
@@ -44,6 +82,8 @@ class Place(BaseModel):
         self.latitude = latitude
         self.longitude = longitude
         self.owner_id = owner_id
+        self.review_count = 0
+        self.rating_sum = 0
 
     @validates('title')
     def validate_title(self, key, title):
@@ -63,18 +103,38 @@ class Place(BaseModel):
     def validate_latitude(self, key, latitude):
         if not isinstance(latitude, (int, float)) or not (-90.0 <= latitude <= 90.0):
             raise ValueError("Latitude must be between -90 and 90")
+        self._update_grid_cell(latitude, self.longitude)
         return latitude
 
     @validates('longitude')
     def validate_longitude(self, key, longitude):
         if not isinstance(longitude, (int, float)) or not (-180.0 <= longitude <= 180.0):
             raise ValueError("Longitude must be between -180 and 180")
+        self._update_grid_cell(self.latitude, longitude)
         return longitude
 
+    def _update_grid_cell(self, latitude, longitude):
+        if latitude is not None and longitude is not None:
+            self.grid_cell = grid_cell(latitude, longitude)
+
+    @property
+    def avg_rating(self):
+        return average_rating(self.review_count, self.rating_sum)
+
     def add_amenity(self, amenity):
         if amenity not in self.amenities:
             self.amenities.append(amenity)
 
+    def set_amenities(self, amenities):
+        """Replace the amenities, keeping the links that do not change"""
+        wanted = {amenity.id: amenity for amenity in amenities}
+        kept = [a for a in self.amenities if a.id in wanted]
+        kept_ids = {amenity.id for amenity in kept}
+        self.amenities = kept + [
+            amenity for amenity_id, amenity in wanted.items()
+            if amenity_id not in kept_ids
+        ]
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -84,6 +144,8 @@ class Place(BaseModel):
             'latitude': self.latitude,
             'longitude': self.longitude,
             'owner_id': self.owner_id,
+            'review_count': self.review_count,
+            'avg_rating': self.avg_rating,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -95,7 +157,9 @@ class Place(BaseModel):
             'description': self.description,
             'price': self.price,
             'latitude': self.latitude,
-            'longitude': self.longitude
+            'longitude': self.longitude,
+            'review_count': self.review_count,
+            'avg_rating': self.avg_rating
         }
         if self.owner:
             summary['owner_name'] = f"{self.owner.first_name} {self.owner.last_name}"
@@ -103,26 +167,64 @@ class Place(BaseModel):
             summary['owner_name'] = "N/A"
         return summary
 
-    def to_detail_dict(self):
-        result = self.to_dict()
-        if self.owner:
-            result['owner'] = {
-                'id': self.owner.id,
-                'first_name': self.owner.first_name,
-                'last_name': self.owner.last_name,
-                'email': self.owner.email
-            }
-            result['owner_name'] = f"{self.owner.first_name} {self.owner.last_name}".strip()
-        else:
-            result['owner_name'] = None
+    @staticmethod
+    def summary_from_row(row):
+        """Build the to_summary_dict of a place from a projection row.
 
-        result['amenities'] = [
-            {'id': amenity.id, 'name': amenity.name}
-            for amenity in self.amenities
-        ]
+        row holds the SUMMARY_COLUMNS plus the owner's first_name and
+        last_name as owner_first_name and owner_last_name, None when the
+        place has no owner.
+        """
+        summary = {
+            name: row[name] for name in SUMMARY_COLUMNS
+            if name != 'rating_sum'
+        }
+        summary['avg_rating'] = average_rating(
+            row['review_count'], row['rating_sum']
+        )
+        if row['owner_first_name'] is not None:
+            summary['owner_name'] = f"{row['owner_first_name']} {row['owner_last_name']}"
+        else:
+            summary['owner_name'] = "N/A"
+        return summary
 
-        result['reviews'] = [
-            review.to_dict_basic() for review in self.reviews
-        ]
+    def to_detail_dict(self, include=tuple(DETAIL_EMBEDS)):
+        """Return to_dict plus the relationships named in include"""
+        result = self.to_dict()
+        if 'owner' in include:
+            if self.owner:
+                result['owner'] = {
+                    'id': self.owner.id,
+                    'first_name': self.owner.first_name,
+                    'last_name': self.owner.last_name,
+                    'email': self.owner.email
+                }
+                result['owner_name'] = f"{self.owner.first_name} {self.owner.last_name}".strip()
+            else:
+                result['owner_name'] = None
+
+        if 'amenities' in include:
+            result['amenities'] = [
+                {'id': amenity.id, 'name': amenity.name}
+                for amenity in self.amenities
+            ]
+
+        if 'reviews' in include:
+            result['reviews'] = [
+                review.to_dict_basic() for review in self.reviews
+            ]
 
         return result
+
+
+# Average rating as the database computes it, 0 for places without
+# reviews. Literals instead of bound parameters, so that queries sorting
+# on it match the expression of ix_places_rating_id.
+RATING_KEY = func.coalesce(
+    cast(Place.rating_sum, Float)
+    / func.nullif(Place.review_count, literal_column('0')),
+    literal_column('0')
+)
+
+# Place listing sorted by rating
+db.Index('ix_places_rating_id', RATING_KEY, Place.id)
@@ -3,8 +3,22 @@ from sqlalchemy.orm import validates, relationship
 from .base_model import BaseModel
 
 
+# Columns read by Review.from_row, in the key order of Review.to_dict
+ROW_COLUMNS = (
+    'id', 'text', 'rating', 'user_id', 'place_id', 'created_at', 'updated_at'
+)
+
+
 class Review(BaseModel):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.UniqueConstraint(
+            'user_id', 'place_id', name='uq_reviews_user_place'
+        ),
+        db.Index(
+            'ix_reviews_place_id_created_at', 'place_id', 'created_at', 'id'
+        ),
+    )
 
     text = db.Column(db.Text, nullable=False)
     rating = db.Column(db.Integer, nullable=False)
@@ -49,6 +63,16 @@ class Review(BaseModel):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+    @staticmethod
+    def from_row(row):
+        """Turn a projection row of ROW_COLUMNS into the to_dict of a review.
+
+        The row dict is converted in place and returned.
+        """
+        for key in ('created_at', 'updated_at'):
+            row[key] = row[key].isoformat() if row[key] else None
+        return row
+
     def to_dict_basic(self):
         return {
             'text': self.text,
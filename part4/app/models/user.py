@@ -1,5 +1,6 @@
-from app import db, bcrypt
+from app import db, password_hasher
 import re
+from datetime import datetime
 from sqlalchemy.orm import validates, relationship
 from .base_model import BaseModel
 
@@ -12,6 +13,8 @@ class User(BaseModel):
     email = db.Column(db.String(120), nullable=False, unique=True)
     password = db.Column(db.String(128), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
+    # Tokens issued before this moment carry stale is_admin claims
+    privileges_changed_at = db.Column(db.DateTime, nullable=True)
 
     places = relationship(
         'Place',
@@ -42,6 +45,14 @@ class User(BaseModel):
             raise ValueError(f"{key} cannot be empty.")
         return name
 
+    @validates('is_admin')
+    def validate_is_admin(self, key, is_admin):
+        if not isinstance(is_admin, bool):
+            raise ValueError("is_admin must be true or false.")
+        if self.is_admin is not None and is_admin != self.is_admin:
+            self.privileges_changed_at = datetime.utcnow()
+        return is_admin
+
     @validates('email')
     def validate_email(self, key, email):
         email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -50,10 +61,13 @@ class User(BaseModel):
         return email
 
     def hash_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = password_hasher.hash(password)
 
     def verify_password(self, password):
-        return bcrypt.check_password_hash(self.password, password)
+        return password_hasher.verify(password, self.password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password)
 
     def to_dict(self):
         return {
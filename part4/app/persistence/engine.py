@@ -0,0 +1,45 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _is_sqlite(url):
+    return url.get_backend_name() == 'sqlite'
+
+
+def _is_memory_sqlite(url):
+    return _is_sqlite(url) and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* settings.
+
+    In-memory SQLite keeps Flask-SQLAlchemy's single shared connection;
+    every other database gets a sized, recycled and pre-pinged pool.
+    Options already present in SQLALCHEMY_ENGINE_OPTIONS win.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {}
+    if not _is_memory_sqlite(url):
+        options.update({
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        })
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run the PRAGMA statements on every new SQLite connection"""
+    if not pragmas or not _is_sqlite(engine.url):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,89 @@
+import math
+
+
+# Size of the square grid cells, in degrees, used to index place positions
+GRID_CELL_DEGREES = 1.0
+GRID_ROWS = int(180 / GRID_CELL_DEGREES)
+GRID_COLUMNS = int(360 / GRID_CELL_DEGREES)
+
+# Above this many cells a bounding box is filtered on coordinates only
+MAX_INDEXED_CELLS = 500
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def _row(latitude):
+    return min(int((latitude + 90) // GRID_CELL_DEGREES), GRID_ROWS - 1)
+
+
+def _column(longitude):
+    return min(int((longitude + 180) // GRID_CELL_DEGREES), GRID_COLUMNS - 1)
+
+
+def grid_cell(latitude, longitude):
+    """Return the index of the grid cell containing a position"""
+    return _row(latitude) * GRID_COLUMNS + _column(longitude)
+
+
+def _column_ranges(west, east):
+    """Column spans of a longitude interval, split at the antimeridian"""
+    if west <= east:
+        return [(_column(west), _column(east))]
+    return [(_column(west), GRID_COLUMNS - 1), (0, _column(east))]
+
+
+def cells_for_bbox(south, west, north, east):
+    """Return the grid cells covering a bounding box.
+
+    A box whose west edge is greater than its east edge crosses the
+    antimeridian. Returns None when the box covers more than
+    MAX_INDEXED_CELLS cells and an index lookup would not pay off.
+    """
+    rows = range(_row(south), _row(north) + 1)
+    columns = [
+        column
+        for first, last in _column_ranges(west, east)
+        for column in range(first, last + 1)
+    ]
+    if len(rows) * len(columns) > MAX_INDEXED_CELLS:
+        return None
+    return [row * GRID_COLUMNS + column for row in rows for column in columns]
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """Return the (south, west, north, east) box enclosing a circle"""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south = max(latitude - delta_lat, -90.0)
+    north = min(latitude + delta_lat, 90.0)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if north >= 90.0 or south <= -90.0 or cos_lat <= 1e-12:
+        return south, -180.0, north, 180.0
+    delta_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if delta_lng >= 180.0:
+        return south, -180.0, north, 180.0
+    west = longitude - delta_lng
+    east = longitude + delta_lng
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+def bbox_center(south, west, north, east):
+    """Return the (latitude, longitude) center of a bounding box"""
+    longitude = (west + east) / 2
+    if west > east:
+        longitude += 180 if longitude <= 0 else -180
+    return (south + north) / 2, longitude
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two positions, in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = (math.sin(d_phi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,88 @@
+import base64
+import binascii
+import math
+from datetime import datetime
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Deepest position a ranked list can be paged to: an offset is skipped row
+# by row, and one too large for a 64-bit integer fails in the database
+MAX_RESULT_WINDOW = 10000
+
+
+def sort_key(obj):
+    """Return the stable (created_at, id) ordering key of an object"""
+    return (obj.created_at or datetime.min, obj.id)
+
+
+def encode_cursor(obj):
+    """Encode the ordering key of the last object of a page as a cursor"""
+    created_at, obj_id = sort_key(obj)
+    raw = f"{created_at.isoformat()}|{obj_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor back into its (created_at, id) ordering key"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, obj_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), obj_id
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def encode_key_cursor(value, obj_id):
+    """Encode the (value, id) ordering key of the last row of a page
+    sorted on a computed number, such as a distance"""
+    raw = f"{value!r}|{obj_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_key_cursor(cursor):
+    """Decode a cursor made by encode_key_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        value, obj_id = raw.split('|', 1)
+        value = float(value)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if not math.isfinite(value):
+        raise ValueError("Invalid cursor")
+    return value, obj_id
+
+
+def encode_offset(offset):
+    """Encode the position of the next page of a ranked list as a cursor.
+
+    Ranked lists have no stable ordering key: a document reindexed between
+    two requests can move across pages. They end at MAX_RESULT_WINDOW.
+    """
+    raw = str(offset).encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_offset(cursor):
+    """Decode a cursor made by encode_offset"""
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if not 0 <= offset <= MAX_RESULT_WINDOW:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def parse_limit(value):
+    """Validate a page size coming from a query string"""
+    if value is None or value == "":
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_PAGE_SIZE)
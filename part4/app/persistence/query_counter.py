@@ -0,0 +1,38 @@
+from sqlalchemy import event
+from app import db
+
+
+class QueryCounter:
+    """Context manager counting the SQL statements sent to the database
+
+    Usage:
+        with QueryCounter() as counter:
+            facade.get_all_places()
+        assert counter.count == 2
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(
+            self.engine, 'before_cursor_execute', self._before_cursor_execute
+        )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(
+            self.engine, 'before_cursor_execute', self._before_cursor_execute
+        )
+        return False
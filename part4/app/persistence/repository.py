@@ -1,5 +1,12 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, lazyload, selectinload
 from app import db
+from app.persistence.pagination import sort_key, encode_cursor, decode_cursor
+from app.persistence.unit_of_work import commit_or_flush, in_unit_of_work
 
 
 class Repository(ABC):
@@ -9,11 +16,68 @@ class Repository(ABC):
         pass
 
     @abstractmethod
-    def get(self, obj_id):
+    def add_all(self, objs):
+        """Add several objects at once, as one batch of inserts"""
         pass
 
     @abstractmethod
-    def get_all(self):
+    def get(self, obj_id, load=None):
+        """Return one object, eager-loading the relationship paths in load
+
+        When load is given, relationships it does not name are not loaded
+        until they are accessed, even those eager by default.
+        """
+        pass
+
+    @abstractmethod
+    def get_many(self, obj_ids, load=None):
+        """Return the objects with the given ids, in request order.
+
+        Unknown ids are skipped and duplicates are returned once.
+        """
+        pass
+
+    @abstractmethod
+    def get_all(self, load=None):
+        pass
+
+    @abstractmethod
+    def get_rows(self, attr_names, filters=None):
+        """Return a {name: value} dict of the attr_names of each object
+
+        Meant for list responses: the SQL implementation selects only these
+        columns and builds the dicts from the result tuples, without
+        creating, validating or tracking model objects.
+        """
+        pass
+
+    @abstractmethod
+    def get_page(self, limit, cursor=None, load=None, ranges=None,
+                 filters=None):
+        """Return (objects, next_cursor) ordered by (created_at, id)
+
+        ranges maps attribute names to inclusive (low, high) bounds, either
+        of which may be None; filters maps attribute names to the value
+        they must equal.
+        """
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size=1000, load=None, filters=None):
+        """Stream every object ordered by (created_at, id)
+
+        Objects are fetched batch_size at a time, so memory use does not
+        grow with the number of stored objects.
+        """
+        pass
+
+    @abstractmethod
+    def get_version(self, filters=None):
+        """Return (count, latest updated_at) of the objects matching filters
+
+        The pair changes whenever a matching object is added, updated or
+        deleted, which makes it a cheap validator for collection responses.
+        """
         pass
 
     @abstractmethod
@@ -28,30 +92,286 @@ class Repository(ABC):
     def get_by_attribute(self, attr_name, attr_value):
         pass
 
+    @abstractmethod
+    def find_all_by_attribute(self, attr_name, attr_value):
+        """Return every object whose attr_name equals attr_value"""
+        pass
+
+    @abstractmethod
+    def find_in_range(self, attr_name, low=None, high=None):
+        """Return the objects with low <= attr_name <= high, ordered by it
+
+        Either bound may be None; objects where attr_name is None are not
+        returned.
+        """
+        pass
+
+
+class _SortedIndex:
+    """Attribute values kept in order, with the id of each object.
+
+    The values are split into chunks of about CHUNK_SIZE, found by bisecting
+    the last value of each chunk, so an insert or a removal only shifts one
+    chunk instead of the whole index. Ids are kept in parallel lists so
+    bisect only ever compares values. None is not indexed: it never falls
+    inside a range.
+    """
+
+    CHUNK_SIZE = 1000
 
-class InMemoryRepository(Repository):
     def __init__(self):
+        self._values = []
+        self._ids = []
+        # last value of each chunk
+        self._maxes = []
+
+    def add(self, value, obj_id):
+        if value is None:
+            return
+        if not self._values:
+            self._values.append([value])
+            self._ids.append([obj_id])
+            self._maxes.append(value)
+            return
+        chunk = min(bisect_right(self._maxes, value), len(self._maxes) - 1)
+        values = self._values[chunk]
+        position = bisect_right(values, value)
+        values.insert(position, value)
+        self._ids[chunk].insert(position, obj_id)
+        self._maxes[chunk] = values[-1]
+        if len(values) > 2 * self.CHUNK_SIZE:
+            half = len(values) // 2
+            ids = self._ids[chunk]
+            self._values[chunk:chunk + 1] = [values[:half], values[half:]]
+            self._ids[chunk:chunk + 1] = [ids[:half], ids[half:]]
+            self._maxes[chunk:chunk + 1] = [values[half - 1], values[-1]]
+
+    def extend(self, pairs):
+        """Add many (value, id) pairs with one sort instead of n inserts"""
+        merged = [
+            pair for chunk in range(len(self._values))
+            for pair in zip(self._values[chunk], self._ids[chunk])
+        ]
+        merged += [(value, obj_id) for value, obj_id in pairs
+                   if value is not None]
+        merged.sort(key=itemgetter(0))
+        self._values, self._ids, self._maxes = [], [], []
+        for start in range(0, len(merged), self.CHUNK_SIZE):
+            chunk = merged[start:start + self.CHUNK_SIZE]
+            self._values.append([value for value, _ in chunk])
+            self._ids.append([obj_id for _, obj_id in chunk])
+            self._maxes.append(chunk[-1][0])
+
+    def remove(self, value, obj_id):
+        if value is None:
+            return
+        chunk = bisect_left(self._maxes, value)
+        while chunk < len(self._values) and self._values[chunk][0] <= value:
+            values, ids = self._values[chunk], self._ids[chunk]
+            low = bisect_left(values, value)
+            high = bisect_right(values, value, low)
+            for position in range(low, high):
+                if ids[position] == obj_id:
+                    del values[position]
+                    del ids[position]
+                    if values:
+                        self._maxes[chunk] = values[-1]
+                    else:
+                        del self._values[chunk]
+                        del self._ids[chunk]
+                        del self._maxes[chunk]
+                    return
+            chunk += 1
+
+    def range(self, low=None, high=None):
+        """Ids of the objects with low <= value <= high, in value order"""
+        found = []
+        chunk = 0 if low is None else bisect_left(self._maxes, low)
+        for values, ids in zip(self._values[chunk:], self._ids[chunk:]):
+            if high is not None and values[0] > high:
+                break
+            start = 0 if low is None else bisect_left(values, low)
+            stop = (len(values) if high is None
+                    else bisect_right(values, high, start))
+            found += ids[start:stop]
+        return found
+
+
+class InMemoryRepository(Repository):
+    """Dict-backed repository, used as a hot tier and for tests
+
+    indexed_attributes get a hash index from value to ids,
+    unique_attributes a hash index from value to the one id holding it
+    (adding a second object with the same value raises ValueError) and
+    sorted_attributes an ordered index serving find_in_range.
+    """
+
+    def __init__(self, indexed_attributes=(), unique_attributes=(),
+                 sorted_attributes=()):
         self._storage = {}
+        # attribute name -> attribute value -> ids of the matching objects
+        self._indexes = {name: {} for name in indexed_attributes}
+        # attribute name -> attribute value -> id of the matching object
+        self._unique_indexes = {name: {} for name in unique_attributes}
+        self._sorted_indexes = {name: _SortedIndex()
+                                for name in sorted_attributes}
 
-    def add(self, obj):
+    def _check_unique(self, values, obj_id=None):
+        """Raise ValueError if another object already holds one of values"""
+        for attr_name, value in values.items():
+            index = self._unique_indexes.get(attr_name)
+            if index is None or value is None:
+                continue
+            holder = index.get(value)
+            if holder is not None and holder != obj_id:
+                raise ValueError(f"{attr_name} '{value}' is already in use")
+
+    def _index(self, obj, sorted_indexes=True):
+        for attr_name, index in self._indexes.items():
+            index.setdefault(getattr(obj, attr_name), set()).add(obj.id)
+        for attr_name, index in self._unique_indexes.items():
+            value = getattr(obj, attr_name)
+            if value is not None:
+                index[value] = obj.id
+        if sorted_indexes:
+            for attr_name, index in self._sorted_indexes.items():
+                index.add(getattr(obj, attr_name), obj.id)
+
+    def _unindex(self, obj):
+        for attr_name, index in self._indexes.items():
+            value = getattr(obj, attr_name)
+            ids = index.get(value)
+            if ids is not None:
+                ids.discard(obj.id)
+                if not ids:
+                    del index[value]
+        for attr_name, index in self._unique_indexes.items():
+            value = getattr(obj, attr_name)
+            if index.get(value) == obj.id:
+                del index[value]
+        for attr_name, index in self._sorted_indexes.items():
+            index.remove(getattr(obj, attr_name), obj.id)
+
+    def _indexed_ids(self, attr_name, value):
+        """Ids holding value, or None when attr_name has no hash index"""
+        if attr_name in self._unique_indexes:
+            obj_id = self._unique_indexes[attr_name].get(value)
+            return set() if obj_id is None else {obj_id}
+        if attr_name in self._indexes:
+            return self._indexes[attr_name].get(value, set())
+        return None
+
+    def _filter(self, filters):
+        """Return the objects matching every attribute == value filter"""
+        indexed = [
+            ids for ids in (self._indexed_ids(name, value)
+                            for name, value in filters.items())
+            if ids is not None
+        ]
+        if indexed:
+            ids = set.intersection(*indexed)
+            objs = [self._storage[obj_id] for obj_id in ids]
+        else:
+            objs = self._storage.values()
+        return [
+            obj for obj in objs
+            if all(getattr(obj, name) == value
+                   for name, value in filters.items())
+        ]
+
+    def _store(self, obj, sorted_indexes=True):
+        self._check_unique(
+            {name: getattr(obj, name) for name in self._unique_indexes},
+            obj.id
+        )
+        if obj.id in self._storage:
+            self._unindex(self._storage[obj.id])
         self._storage[obj.id] = obj
+        self._index(obj, sorted_indexes)
 
-    def get(self, obj_id):
+    def add(self, obj):
+        self._store(obj)
+
+    def add_all(self, objs):
+        # One insert into a sorted index shifts the whole list behind it,
+        # so a batch is appended and sorted once
+        stored = []
+        try:
+            for obj in objs:
+                self._store(obj, sorted_indexes=False)
+                stored.append(obj)
+        finally:
+            for attr_name, index in self._sorted_indexes.items():
+                index.extend(
+                    (getattr(obj, attr_name), obj.id) for obj in stored
+                )
+
+    def get(self, obj_id, load=None):
         return self._storage.get(obj_id)
 
-    def get_all(self):
+    def get_many(self, obj_ids, load=None):
+        return [
+            self._storage[obj_id] for obj_id in dict.fromkeys(obj_ids)
+            if obj_id in self._storage
+        ]
+
+    def get_all(self, load=None):
         return list(self._storage.values())
 
+    def get_rows(self, attr_names, filters=None):
+        return [
+            {name: getattr(obj, name) for name in attr_names}
+            for obj in self._filter(filters or {})
+        ]
+
+    def get_page(self, limit, cursor=None, load=None, ranges=None,
+                 filters=None):
+        objs = self._filter(filters or {})
+        for attr_name, (low, high) in (ranges or {}).items():
+            if attr_name in self._sorted_indexes:
+                ids = set(self._sorted_indexes[attr_name].range(low, high))
+                objs = [obj for obj in objs if obj.id in ids]
+            else:
+                objs = [
+                    obj for obj in objs
+                    if (low is None or getattr(obj, attr_name) >= low)
+                    and (high is None or getattr(obj, attr_name) <= high)
+                ]
+        objs.sort(key=sort_key)
+        if cursor:
+            after = decode_cursor(cursor)
+            objs = [obj for obj in objs if sort_key(obj) > after]
+        page = objs[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(objs) > limit else None
+        return page, next_cursor
+
+    def iter_all(self, batch_size=1000, load=None, filters=None):
+        return iter(sorted(self._filter(filters or {}), key=sort_key))
+
+    def get_version(self, filters=None):
+        objs = self._filter(filters or {})
+        updated = [obj.updated_at for obj in objs if obj.updated_at]
+        return len(objs), max(updated, default=None)
+
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
-            obj.update(data)
+            self._check_unique(data, obj_id)
+            self._unindex(obj)
+            try:
+                obj.update(data)
+            finally:
+                self._index(obj)
 
     def delete(self, obj_id):
         if obj_id in self._storage:
+            self._unindex(self._storage[obj_id])
             del self._storage[obj_id]
 
     def get_by_attribute(self, attr_name, attr_value):
+        ids = self._indexed_ids(attr_name, attr_value)
+        if ids is not None:
+            return self._storage[next(iter(ids))] if ids else None
         return next(
             (
                 obj for obj in self._storage.values()
@@ -60,35 +380,189 @@ class InMemoryRepository(Repository):
             None
         )
 
+    def find_all_by_attribute(self, attr_name, attr_value):
+        return self._filter({attr_name: attr_value})
+
+    def find_in_range(self, attr_name, low=None, high=None):
+        index = self._sorted_indexes.get(attr_name)
+        if index is not None:
+            return [self._storage[obj_id]
+                    for obj_id in index.range(low, high)]
+        objs = [
+            obj for obj in self._storage.values()
+            if getattr(obj, attr_name) is not None
+            and (low is None or getattr(obj, attr_name) >= low)
+            and (high is None or getattr(obj, attr_name) <= high)
+        ]
+        return sorted(objs, key=lambda obj: getattr(obj, attr_name))
+
 
 class SQLAlchemyRepository(Repository):
-    """SQLAlchemy implementation of the Repository interface"""
+    """SQLAlchemy implementation of the Repository interface
+
+    Writes are flushed, not committed, while a UnitOfWork is open; the unit
+    of work commits them all at once. Outside of one every write commits.
+    """
 
     def __init__(self, model):
         self.model = model
 
+    def _write(self):
+        try:
+            commit_or_flush()
+        except IntegrityError:
+            # Inside a unit of work the rollback is left to the unit of work
+            if not in_unit_of_work():
+                db.session.rollback()
+            raise
+
     def add(self, obj):
         db.session.add(obj)
-        db.session.commit()
+        self._write()
+
+    def add_all(self, objs):
+        db.session.add_all(objs)
+        self._write()
+
+    def bulk_insert(self, rows):
+        """Insert plain column dicts with one executemany, bypassing the ORM.
+
+        Every row must carry the same keys, including id and timestamps.
+        """
+        if rows:
+            db.session.execute(insert(self.model.__table__), rows)
+            self._write()
+
+    def iter_keys(self, *attr_names, batch_size=10000):
+        """Stream tuples of the given attributes of every stored object"""
+        columns = [getattr(self.model, name) for name in attr_names]
+        return db.session.query(*columns).yield_per(batch_size)
+
+    def _loader_option(self, path):
+        """Build the eager-loading option for a dotted relationship path.
+
+        Many-to-one hops are joined into the parent query, collections are
+        fetched with one extra SELECT ... IN per hop.
+        """
+        model = self.model
+        option = None
+        for name in path.split('.'):
+            attr = getattr(model, name)
+            if attr.property.uselist:
+                option = (selectinload(attr) if option is None
+                          else option.selectinload(attr))
+            else:
+                option = (joinedload(attr) if option is None
+                          else option.joinedload(attr))
+            model = attr.property.mapper.class_
+        return option
+
+    def _query(self, load=None):
+        query = self.model.query
+        if load is not None:
+            query = query.options(
+                lazyload('*'),
+                *[self._loader_option(path) for path in load]
+            )
+        return query
+
+    def _apply_ranges(self, query, ranges=None):
+        for attr_name, (low, high) in (ranges or {}).items():
+            column = getattr(self.model, attr_name)
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        return query
 
-    def get(self, obj_id):
+    def get(self, obj_id, load=None):
+        if load is not None:
+            return self._query(load).filter(self.model.id == obj_id).first()
         return self.model.query.get(obj_id)
 
-    def get_all(self):
-        return self.model.query.all()
+    def get_many(self, obj_ids, load=None):
+        obj_ids = list(dict.fromkeys(obj_ids))
+        if not obj_ids:
+            return []
+        found = {
+            obj.id: obj for obj in
+            self._query(load).filter(self.model.id.in_(obj_ids)).all()
+        }
+        return [found[obj_id] for obj_id in obj_ids if obj_id in found]
+
+    def get_all(self, load=None):
+        return self._query(load).all()
+
+    def get_rows(self, attr_names, filters=None):
+        query = select(*[getattr(self.model, name) for name in attr_names])
+        if filters:
+            query = query.filter_by(**filters)
+        return [
+            dict(zip(attr_names, row)) for row in db.session.execute(query)
+        ]
+
+    def get_page(self, limit, cursor=None, load=None, ranges=None,
+                 filters=None):
+        query = self._query(load).order_by(
+            self.model.created_at, self.model.id
+        )
+        if filters:
+            query = query.filter_by(**filters)
+        query = self._apply_ranges(query, ranges)
+        if cursor:
+            created_at, obj_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                self.model.created_at > created_at,
+                and_(
+                    self.model.created_at == created_at,
+                    self.model.id > obj_id
+                )
+            ))
+        rows = query.limit(limit + 1).all()
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+        return page, next_cursor
+
+    def iter_all(self, batch_size=1000, load=None, filters=None):
+        # Mapper-level eager loads (lazy='subquery') cannot be combined with
+        # yield_per; only the relationships asked for in load are eager
+        query = self._query(load or ()).order_by(
+            self.model.created_at, self.model.id
+        )
+        if filters:
+            query = query.filter_by(**filters)
+        # yield_per streams from a server-side cursor where the driver has one
+        return query.yield_per(batch_size)
+
+    def get_version(self, filters=None):
+        query = db.session.query(
+            func.count(self.model.id), func.max(self.model.updated_at)
+        )
+        if filters:
+            query = query.filter_by(**filters)
+        count, last_updated = query.one()
+        return count, last_updated
 
     def update(self, obj_id, data):
         obj = self.get(obj_id)
         if obj:
             for key, value in data.items():
                 setattr(obj, key, value)
-            db.session.commit()
+            self._write()
 
     def delete(self, obj_id):
         obj = self.get(obj_id)
         if obj:
             db.session.delete(obj)
-            db.session.commit()
+            self._write()
 
     def get_by_attribute(self, attr_name, attr_value):
         return self.model.query.filter_by(**{attr_name: attr_value}).first()
+
+    def find_all_by_attribute(self, attr_name, attr_value):
+        return self.model.query.filter_by(**{attr_name: attr_value}).all()
+
+    def find_in_range(self, attr_name, low=None, high=None):
+        column = getattr(self.model, attr_name)
+        query = self._apply_ranges(self.model.query, {attr_name: (low, high)})
+        return query.filter(column.isnot(None)).order_by(column).all()
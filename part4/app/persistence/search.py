@@ -0,0 +1,271 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from sqlalchemy import DDL, event, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.persistence.unit_of_work import after_commit
+
+
+# Weight of a match in each indexed field when ranking places; the
+# reviews field holds the text of every review of the place
+FIELD_WEIGHTS = {'title': 10.0, 'description': 5.0, 'reviews': 1.0}
+
+# BM25 parameters, the ones SQLite's FTS5 uses
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# One searchable document per place. FTS5 indexes it as an external
+# content table: the triggers below keep place_search in step with it.
+search_documents = db.Table(
+    'place_search_documents',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('place_id', db.String(36), db.ForeignKey('places.id'),
+              nullable=False, unique=True),
+    db.Column('title', db.Text),
+    db.Column('description', db.Text),
+    db.Column('reviews', db.Text),
+)
+
+FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS place_search USING fts5("
+    "title, description, reviews, "
+    "content='place_search_documents', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS place_search_ai "
+    "AFTER INSERT ON place_search_documents BEGIN "
+    "INSERT INTO place_search (rowid, title, description, reviews) "
+    "VALUES (new.id, new.title, new.description, new.reviews); END",
+    "CREATE TRIGGER IF NOT EXISTS place_search_ad "
+    "AFTER DELETE ON place_search_documents BEGIN "
+    "INSERT INTO place_search "
+    "(place_search, rowid, title, description, reviews) "
+    "VALUES ('delete', old.id, old.title, old.description, old.reviews); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS place_search_au "
+    "AFTER UPDATE ON place_search_documents BEGIN "
+    "INSERT INTO place_search "
+    "(place_search, rowid, title, description, reviews) "
+    "VALUES ('delete', old.id, old.title, old.description, old.reviews); "
+    "INSERT INTO place_search (rowid, title, description, reviews) "
+    "VALUES (new.id, new.title, new.description, new.reviews); END",
+)
+
+
+def fts5_available(bind):
+    """Whether bind is a SQLite database compiled with FTS5"""
+    if bind.dialect.name != 'sqlite':
+        return False
+    options = bind.exec_driver_sql('PRAGMA compile_options').scalars()
+    return 'ENABLE_FTS5' in set(options)
+
+
+def _create_fts(ddl, target, bind, **kw):
+    return fts5_available(bind)
+
+
+for _statement in FTS_DDL:
+    event.listen(search_documents, 'after_create',
+                 DDL(_statement).execute_if(callable_=_create_fts))
+event.listen(search_documents, 'before_drop',
+             DDL('DROP TABLE IF EXISTS place_search')
+             .execute_if(dialect='sqlite'))
+
+
+def tokenize(value):
+    """Lowercased words of value, without diacritics.
+
+    Splits like FTS5's unicode61 tokenizer: letters and digits make words,
+    everything else separates them.
+    """
+    if not value:
+        return []
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return re.findall(r'[^\W_]+', stripped.lower())
+
+
+def _document_rows():
+    """Yield (place_id, title, description, reviews) of every place"""
+    places = db.metadata.tables['places']
+    reviews = db.metadata.tables['reviews']
+    texts = {}
+    for place_id, review_text in db.session.execute(
+            select(reviews.c.place_id, reviews.c.text)):
+        texts.setdefault(place_id, []).append(review_text)
+    for place_id, title, description in db.session.execute(
+            select(places.c.id, places.c.title, places.c.description)):
+        yield (place_id, title, description,
+               '\n'.join(texts.get(place_id, ())))
+
+
+def create_search_index():
+    """FTS5 index on SQLite builds that have it, in-memory index otherwise.
+
+    Must be called inside an application context.
+    """
+    with db.engine.connect() as connection:
+        if fts5_available(connection):
+            return FTSSearchIndex()
+    return InMemorySearchIndex()
+
+
+class FTSSearchIndex:
+    """Search index stored in the database, ranked by FTS5's bm25()
+
+    Documents are written in the caller's transaction, so they commit or
+    roll back together with the change they reflect.
+    """
+
+    def index(self, place_id, title, description, reviews):
+        """Replace the document of a place"""
+        values = {
+            'title': title,
+            'description': description,
+            'reviews': '\n'.join(reviews),
+        }
+        db.session.execute(
+            sqlite_insert(search_documents)
+            .values(place_id=place_id, **values)
+            .on_conflict_do_update(index_elements=['place_id'], set_=values)
+        )
+
+    def search(self, terms, limit, offset=0):
+        """Return (place_id, score) of the best matches, best first.
+
+        A place matches when every term appears in one of its fields.
+        """
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        rows = db.session.execute(text(
+            f"SELECT d.place_id, bm25(place_search, {weights}) AS rank "
+            "FROM place_search "
+            "JOIN place_search_documents d ON d.id = place_search.rowid "
+            "WHERE place_search MATCH :query "
+            "ORDER BY rank, d.place_id LIMIT :limit OFFSET :offset"
+        ), {
+            # Quoted terms are matched literally, whatever their spelling
+            'query': ' '.join(f'"{term}"' for term in terms),
+            'limit': limit,
+            'offset': offset,
+        })
+        # bm25() is lower for better matches
+        return [(place_id, -rank) for place_id, rank in rows]
+
+    def rebuild(self):
+        """Rebuild every document from the places and reviews tables"""
+        db.session.execute(search_documents.delete())
+        db.session.execute(search_documents.insert(), [
+            {'place_id': place_id, 'title': title,
+             'description': description, 'reviews': reviews}
+            for place_id, title, description, reviews in _document_rows()
+        ])
+
+
+class InMemorySearchIndex:
+    """Inverted index kept in the process, for databases without FTS5.
+
+    Built from the database on first use, then changed after each commit
+    that indexes a document. Ranks with the same weighted BM25 as FTS5
+    but matches exact words only, without stemming; writes made by other
+    processes are not seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        # term -> place id -> weighted count of the term in the document
+        self._postings = {}
+        # place id -> (terms of the document, number of tokens)
+        self._documents = {}
+        self._total_length = 0
+
+    def _add(self, place_id, fields):
+        self._remove(place_id)
+        counts = Counter()
+        length = 0
+        for name, value in fields.items():
+            tokens = tokenize(value)
+            length += len(tokens)
+            weight = FIELD_WEIGHTS[name]
+            for token in tokens:
+                counts[token] += weight
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[place_id] = count
+        self._documents[place_id] = (tuple(counts), length)
+        self._total_length += length
+
+    def _remove(self, place_id):
+        document = self._documents.pop(place_id, None)
+        if document is None:
+            return
+        terms, length = document
+        for term in terms:
+            postings = self._postings[term]
+            del postings[place_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= length
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            for place_id, title, description, reviews in _document_rows():
+                self._add(place_id, {'title': title,
+                                     'description': description,
+                                     'reviews': reviews})
+            self._loaded = True
+
+    def index(self, place_id, title, description, reviews):
+        """Replace the document of a place once the transaction commits"""
+        fields = {
+            'title': title,
+            'description': description,
+            'reviews': '\n'.join(reviews),
+        }
+
+        def apply():
+            # Until loaded, the load will read the committed row instead
+            if self._loaded:
+                with self._lock:
+                    self._add(place_id, fields)
+        after_commit(apply)
+
+    def search(self, terms, limit, offset=0):
+        """Return (place_id, score) of the best matches, best first.
+
+        A place matches when every term appears in one of its fields.
+        """
+        self._load()
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+            count = len(self._documents)
+            average_length = self._total_length / count
+            scores = {}
+            for place_id in set.intersection(*[set(p) for p in postings]):
+                length = self._documents[place_id][1]
+                norm = BM25_K1 * (1 - BM25_B
+                                  + BM25_B * length / average_length)
+                score = 0.0
+                for term_postings in postings:
+                    matching = len(term_postings)
+                    idf = math.log((count - matching + 0.5)
+                                   / (matching + 0.5))
+                    frequency = term_postings[place_id]
+                    score += (max(idf, 1e-6) * frequency * (BM25_K1 + 1)
+                              / (frequency + norm))
+                scores[place_id] = score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[offset:offset + limit]
+
+    def rebuild(self):
+        """Drop the index; it is built again from the database on next use"""
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._total_length = 0
+            self._loaded = False
@@ -0,0 +1,109 @@
+import json
+import logging
+import sys
+import time
+from flask.logging import default_handler
+from sqlalchemy import event
+
+
+logger = logging.getLogger('hbnb.slow_queries')
+
+# Longest repr of the bound parameters written to the log
+MAX_PARAMETERS_LENGTH = 500
+
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+
+def _calling_facade_method():
+    """Name of the innermost HBnBFacade method on the call stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.replace('\\', '/').endswith('services/facade.py'):
+            return f"HBnBFacade.{code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _explain(conn, statement, parameters):
+    """Return the query plan rows of a statement.
+
+    Runs on the raw DBAPI connection so the EXPLAIN itself is neither timed
+    nor logged.
+    """
+    prefix = ('EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite'
+              else 'EXPLAIN ')
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [tuple(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def full_scans(plan):
+    """Return the plan lines that read a whole table.
+
+    SQLite reports them as "SCAN <table>" without an index, PostgreSQL as
+    "Seq Scan" and MySQL with an access type of ALL.
+    """
+    scans = []
+    for row in plan:
+        detail = str(row[-1])
+        if detail.startswith('SCAN ') and 'INDEX' not in detail:
+            scans.append(detail)
+        elif 'Seq Scan' in detail or 'ALL' in row:
+            scans.append(' '.join(str(part) for part in row))
+    return scans
+
+
+def enable_slow_query_log(engine, threshold_ms):
+    """Log every statement running longer than threshold_ms milliseconds.
+
+    Each slow statement is logged as one JSON line to the
+    "hbnb.slow_queries" logger, with its bound parameters, the facade
+    method that issued it and its query plan; plans reading a whole table
+    are flagged. A threshold of None disables the log.
+    """
+    if threshold_ms is None:
+        return
+    threshold = threshold_ms / 1000
+    if not logger.handlers:
+        logger.addHandler(default_handler)
+        logger.setLevel(logging.INFO)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context,
+                    executemany):
+        if context is not None:
+            context.slow_query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def log_slow_query(conn, cursor, statement, parameters, context,
+                       executemany):
+        started = getattr(context, 'slow_query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < threshold:
+            return
+
+        record = {
+            'duration_ms': round(elapsed * 1000, 2),
+            'statement': statement,
+            'parameters': repr(parameters)[:MAX_PARAMETERS_LENGTH],
+            'executemany': executemany,
+            'facade_method': _calling_facade_method(),
+        }
+        if (not executemany
+                and statement.lstrip().upper().startswith(_EXPLAINABLE)):
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception as e:  # a failed EXPLAIN must not fail the query
+                record['plan_error'] = str(e)
+            else:
+                record['plan'] = [
+                    ' '.join(str(part) for part in row) for row in plan
+                ]
+                record['full_scans'] = full_scans(plan)
+        logger.warning(json.dumps(record, default=str))
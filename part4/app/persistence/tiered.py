@@ -0,0 +1,504 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from itertools import chain
+from sqlalchemy import delete, event, inspect, insert, select, update
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.persistence.repository import InMemoryRepository, Repository
+from app.persistence.unit_of_work import commit_or_flush
+
+
+logger = logging.getLogger('hbnb.tiered')
+
+WRITE_THROUGH = 'write-through'
+WRITE_BEHIND = 'write-behind'
+CONSISTENCY_MODES = (WRITE_THROUGH, WRITE_BEHIND)
+
+# Above this many changed ids the store is reloaded whole instead of by id
+MAX_STALE_IDS = 1000
+
+
+class _Row:
+    """Column values of one stored object, as indexed by the store"""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    def update(self, data):
+        self.__dict__.update(data)
+
+
+def tiered(backing, consistency=None):
+    """Wrap backing in a TieredRepository unless consistency is None"""
+    if consistency is None:
+        return backing
+    return TieredRepository(backing, consistency)
+
+
+class TieredRepository(Repository):
+    """In-process store in front of a SQLAlchemyRepository.
+
+    get, get_many, get_all, get_rows, get_version and the attribute lookups
+    are served from a dict of column values loaded on first use, without a
+    SELECT; every other call goes to the backing repository. Objects are
+    handed out attached to the current session, so relationships still load
+    lazily and changes are flushed as usual. Reads asking for eager loads
+    go to the backing repository too.
+
+    The consistency mode decides how writes reach the database:
+
+    write-through: writes go to the backing repository inside the caller's
+    unit of work. The ids the session inserted, updated or deleted (ORM
+    flushes and bulk statements alike) are reloaded once it commits, and
+    forgotten if it rolls back.
+
+    write-behind: writes change the store at once and are queued. The queue
+    is written to the database when it holds flush_size writes, before the
+    session flushes anything else (so rows referencing a queued object find
+    it), when a call goes to the backing repository, and after a request
+    once the oldest write is flush_interval seconds old. Queued writes are
+    lost if the process dies; SQL queries do not see them until then.
+    Queued writes hold column values only: collections set on a new object
+    (a place's amenities) are not written.
+
+    Other processes do not notify the store: every ttl seconds it compares
+    its (count, latest updated_at) with the database and reloads when they
+    differ.
+    """
+
+    def __init__(self, backing, consistency=WRITE_THROUGH, ttl=60.0,
+                 flush_size=100, flush_interval=5.0):
+        if consistency not in CONSISTENCY_MODES:
+            raise ValueError(
+                f"consistency must be one of {', '.join(CONSISTENCY_MODES)}"
+            )
+        self.backing = backing
+        self.model = backing.model
+        self.consistency = consistency
+        self.ttl = ttl
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        mapper = inspect(self.model)
+        self._table = self.model.__table__
+        # attribute name -> table column
+        self._columns = {
+            attr.key: attr.columns[0] for attr in mapper.column_attrs
+        }
+        self._unique = tuple(
+            key for key, column in self._columns.items()
+            if column.unique and not column.primary_key
+        )
+        self._foreign_keys = tuple(
+            key for key, column in self._columns.items()
+            if column.foreign_keys
+        )
+
+        self._lock = threading.RLock()
+        self._store = None
+        self._stale = set()
+        self._checked_at = 0.0
+        self._queue = []
+        self._queued_at = None
+        # ids with a queued write, whose database row is out of date
+        self._queued_ids = set()
+
+        # session.info keys of the ids changed and the queued writes
+        # flushed by the running transaction; one pair per tier, as two
+        # tiers of the same table (two facades) must not pop each other's
+        self._changed_key = f'hbnb_tier_changed_{self._table.name}_{id(self)}'
+        self._flushed_key = f'hbnb_tier_flushed_{self._table.name}_{id(self)}'
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'do_orm_execute', self._do_orm_execute)
+        event.listen(db.session, 'before_flush', self._before_flush)
+        event.listen(db.session, 'before_commit', self._before_commit)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_rollback', self._after_rollback)
+        event.listen(self.model, 'load', self._after_load)
+        event.listen(self.model, 'refresh', self._after_load)
+
+    def __getattr__(self, name):
+        # Model-specific methods (get_in_bbox, touch, ...) go to the
+        # backing repository, which must see the queued writes
+        attr = getattr(self.backing, name)
+        if callable(attr) and self._queue:
+            self.flush()
+        return attr
+
+    # -- store ------------------------------------------------------------
+
+    def _select(self, ids=None):
+        keys = list(self._columns)
+        query = select(*self._columns.values())
+        if ids is not None:
+            query = query.where(self._table.c.id.in_(ids))
+        return [
+            _Row(dict(zip(keys, row))) for row in db.session.execute(query)
+        ]
+
+    def _load(self):
+        store = InMemoryRepository(indexed_attributes=self._foreign_keys,
+                                   unique_attributes=self._unique)
+        store.add_all(self._select())
+        self._store = store
+        self._stale.clear()
+        self._checked_at = time.monotonic()
+
+    def warm(self):
+        """Load the store now instead of on first use.
+
+        Does nothing while the table does not exist yet.
+        """
+        if inspect(db.engine).has_table(self._table.name):
+            with self._lock:
+                self._load()
+
+    def _reload(self, ids):
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            for obj_id in batch:
+                self._store.delete(obj_id)
+            self._store.add_all(self._select(batch))
+
+    def _fresh(self):
+        """Return the store after applying the changes seen since last use"""
+        with self._lock:
+            if self._store is None:
+                if self._queue:
+                    self.flush()
+                self._load()
+            elif (self.ttl is not None
+                  and time.monotonic() - self._checked_at >= self.ttl):
+                if self._queue:
+                    self.flush()
+                if self.backing.get_version() != self._store.get_version():
+                    self._load()
+                self._checked_at = time.monotonic()
+            if self._stale:
+                if len(self._stale) > MAX_STALE_IDS:
+                    self._load()
+                else:
+                    self._reload(self._stale)
+                    self._stale.clear()
+            return self._store
+
+    def _instance(self, row):
+        """Build a detached model instance holding the values of row"""
+        obj = self.model.__mapper__.class_manager.new_instance()
+        for key in self._columns:
+            set_committed_value(obj, key, getattr(row, key))
+        make_transient_to_detached(obj)
+        return obj
+
+    def _attach(self, row):
+        """Return the session's instance for row, creating it without SQL.
+
+        An instance already in the session wins, it may hold changes the
+        store has not seen yet.
+        """
+        key = self.model.__mapper__.identity_key_from_primary_key((row.id,))
+        existing = db.session.identity_map.get(key)
+        if existing is not None:
+            return existing
+        return db.session.merge(self._instance(row), load=False)
+
+    # -- session events ---------------------------------------------------
+
+    def _mark_changed(self, session, ids):
+        session.info.setdefault(self._changed_key, set()).update(ids)
+
+    def _after_flush(self, session, flush_context):
+        self._mark_changed(session, [
+            obj.id for obj in chain(session.new, session.dirty,
+                                    session.deleted)
+            if isinstance(obj, self.model)
+        ])
+
+    def _do_orm_execute(self, state):
+        """Record the ids touched by bulk statements on the table"""
+        if not (state.is_insert or state.is_update or state.is_delete):
+            return
+        statement = state.statement
+        if getattr(statement.table, 'name', None) != self._table.name:
+            return
+        if state.is_insert:
+            params = state.parameters
+            rows = params if isinstance(params, list) else [params]
+            ids = [row.get('id') for row in rows]
+            if None not in ids:
+                self._mark_changed(state.session, ids)
+                return
+        elif statement.whereclause is not None:
+            self._mark_changed(state.session, state.session.execute(
+                select(self._table.c.id).where(statement.whereclause)
+            ).scalars())
+            return
+        # No way to tell which rows: reload everything
+        self._mark_changed(state.session, [None])
+
+    def _after_load(self, target, context, attrs=None):
+        """Give an object loaded by SQL the values of its queued write.
+
+        A query or a relationship may load a row whose queued update is
+        not written yet; the object must not show the values the database
+        holds until then.
+        """
+        obj_id = target.__dict__.get('id')
+        if obj_id not in self._queued_ids or self._store is None:
+            return
+        row = self._store.get(obj_id)
+        if row is not None:
+            for key in self._columns:
+                set_committed_value(target, key, getattr(row, key))
+
+    def _before_flush(self, session, flush_context, instances):
+        if self._queue:
+            self._write_queue(session)
+
+    def _before_commit(self, session):
+        """Detach the objects whose queued write is still pending.
+
+        Committing expires every object of the session, and the reload
+        of one whose row is not written yet would fail (or bring back the
+        old values). Detached, they keep their values for the caller. The
+        session is flushed first: a flush with ORM changes writes the
+        queue, and a detached object would lose its unflushed changes.
+        """
+        if not self._queued_ids:
+            return
+        session.flush()
+        with self._lock:
+            queued_ids = set(self._queued_ids)
+        for obj in list(session.identity_map.values()):
+            if (isinstance(obj, self.model)
+                    and obj.__dict__.get('id') in queued_ids):
+                session.expunge(obj)
+
+    def _after_commit(self, session):
+        session.info.pop(self._flushed_key, None)
+        ids = session.info.pop(self._changed_key, None)
+        if ids:
+            with self._lock:
+                if None in ids:
+                    self._store = None
+                else:
+                    self._stale.update(ids)
+
+    def _after_rollback(self, session):
+        session.info.pop(self._changed_key, None)
+        flushed = session.info.pop(self._flushed_key, None)
+        if flushed:
+            # The writes are still wanted, they go out with the next flush
+            with self._lock:
+                self._queue[:0] = flushed
+                self._queued_ids.update(values['id'] for _, values in flushed)
+
+    # -- write-behind queue -----------------------------------------------
+
+    def _enqueue(self, operation):
+        with self._lock:
+            if not self._queue:
+                self._queued_at = time.monotonic()
+            self._queue.append(operation)
+            self._queued_ids.add(operation[1]['id'])
+            full = len(self._queue) >= self.flush_size
+        if full:
+            self.flush()
+
+    def _write_queue(self, session):
+        """Run the queued writes in the session's transaction"""
+        with self._lock:
+            operations, self._queue = self._queue, []
+            self._queued_at = None
+            self._queued_ids.clear()
+        if not operations:
+            return
+        connection = session.connection()
+        table = self._table
+        try:
+            inserts = []
+            for kind, values in operations + [(None, None)]:
+                if kind == 'insert':
+                    inserts.append(values)
+                    continue
+                if inserts:
+                    connection.execute(insert(table), inserts)
+                    inserts = []
+                if kind == 'update':
+                    connection.execute(
+                        update(table).where(table.c.id == values['id'])
+                        .values(values)
+                    )
+                elif kind == 'delete':
+                    connection.execute(
+                        delete(table).where(table.c.id == values['id'])
+                    )
+        except Exception:
+            logger.exception("dropped %d queued %s writes", len(operations),
+                             table.name)
+            with self._lock:
+                self._store = None
+            raise
+        session.info.setdefault(self._flushed_key, []).extend(operations)
+
+    def _row_values(self, obj):
+        """Column values of obj, filling the defaults a flush would set"""
+        values = {}
+        for key, column in self._columns.items():
+            value = getattr(obj, key)
+            if value is None and column.default is not None:
+                if column.default.is_callable:
+                    value = column.default.arg(None)
+                elif column.default.is_scalar:
+                    value = column.default.arg
+                setattr(obj, key, value)
+            values[key] = value
+        return values
+
+    def _column_values(self, values):
+        """Key attribute values by table column, for Core statements"""
+        return {self._columns[key].key: value for key, value in values.items()}
+
+    def flush(self):
+        """Write the queued writes now, inside the running unit of work"""
+        if self._queue:
+            self._write_queue(db.session)
+            commit_or_flush()
+
+    def flush_due(self):
+        """Flush once the oldest queued write is flush_interval seconds old.
+
+        Runs after a request, where nobody is left to handle an error: a
+        failed flush is logged and rolled back, and its writes dropped.
+        """
+        queued_at = self._queued_at
+        if (queued_at is None
+                or time.monotonic() - queued_at < self.flush_interval):
+            return
+        try:
+            self.flush()
+        except Exception:
+            db.session.rollback()
+            # A rolled back flush puts its writes back in the queue; they
+            # would fail again, so they are dropped and the store reloaded
+            with self._lock:
+                dropped, self._queue = self._queue, []
+                self._queued_ids.clear()
+                self._store = None
+            if dropped:
+                logger.error("dropped %d queued %s writes", len(dropped),
+                             self._table.name)
+
+    # -- Repository -------------------------------------------------------
+
+    def add(self, obj):
+        if self.consistency == WRITE_THROUGH:
+            return self.backing.add(obj)
+        values = self._row_values(obj)
+        with self._lock:
+            self._fresh().add(_Row(values))
+        self._enqueue(('insert', self._column_values(values)))
+
+    def add_all(self, objs):
+        if self.consistency == WRITE_THROUGH:
+            return self.backing.add_all(objs)
+        for obj in objs:
+            self.add(obj)
+
+    def get(self, obj_id, load=None):
+        if load:
+            self.flush()
+            return self.backing.get(obj_id, load)
+        row = self._fresh().get(obj_id)
+        if row is None:
+            if obj_id in self._queued_ids:
+                # Its delete is queued
+                return None
+            # Added by the running transaction, or does not exist
+            return self.backing.get(obj_id)
+        return self._attach(row)
+
+    def get_many(self, obj_ids, load=None):
+        if load:
+            self.flush()
+            return self.backing.get_many(obj_ids, load)
+        return [self._attach(row)
+                for row in self._fresh().get_many(obj_ids)]
+
+    def get_all(self, load=None):
+        if load:
+            self.flush()
+            return self.backing.get_all(load)
+        return [self._attach(row) for row in self._fresh().get_all()]
+
+    def get_rows(self, attr_names, filters=None):
+        return self._fresh().get_rows(attr_names, filters)
+
+    def get_page(self, limit, cursor=None, load=None, ranges=None,
+                 filters=None):
+        self.flush()
+        return self.backing.get_page(limit, cursor, load, ranges, filters)
+
+    def iter_all(self, batch_size=1000, load=None, filters=None):
+        self.flush()
+        return self.backing.iter_all(batch_size, load, filters)
+
+    def get_version(self, filters=None):
+        return self._fresh().get_version(filters)
+
+    def update(self, obj_id, data):
+        if self.consistency == WRITE_THROUGH:
+            return self.backing.update(obj_id, data)
+        with self._lock:
+            store = self._fresh()
+            row = store.get(obj_id)
+            if row is None:
+                return
+            # Run the model validators on a copy outside the session
+            obj = self._instance(row)
+            for key, value in data.items():
+                setattr(obj, key, value)
+            obj.updated_at = datetime.utcnow()
+            changed = {
+                key: getattr(obj, key) for key in chain(data, ['updated_at'])
+                if key in self._columns
+            }
+            store.update(obj_id, changed)
+        key = self.model.__mapper__.identity_key_from_primary_key((obj_id,))
+        existing = db.session.identity_map.get(key)
+        if existing is not None:
+            for name, value in changed.items():
+                set_committed_value(existing, name, value)
+        self._enqueue(
+            ('update', self._column_values({**changed, 'id': obj_id}))
+        )
+
+    def delete(self, obj_id):
+        if self.consistency == WRITE_THROUGH:
+            return self.backing.delete(obj_id)
+        with self._lock:
+            store = self._fresh()
+            if store.get(obj_id) is None:
+                return
+            store.delete(obj_id)
+        key = self.model.__mapper__.identity_key_from_primary_key((obj_id,))
+        existing = db.session.identity_map.get(key)
+        if existing is not None:
+            db.session.expunge(existing)
+        self._enqueue(('delete', {'id': obj_id}))
+
+    def get_by_attribute(self, attr_name, attr_value):
+        row = self._fresh().get_by_attribute(attr_name, attr_value)
+        return None if row is None else self._attach(row)
+
+    def find_all_by_attribute(self, attr_name, attr_value):
+        return [self._attach(row) for row in
+                self._fresh().find_all_by_attribute(attr_name, attr_value)]
+
+    def find_in_range(self, attr_name, low=None, high=None):
+        return [self._attach(row) for row in
+                self._fresh().find_in_range(attr_name, low, high)]
@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from functools import wraps
+from app import db
+
+
+_DEPTH = 'hbnb_uow_depth'
+_CALLBACKS = 'hbnb_uow_after_commit'
+
+
+class UnitOfWork:
+    """Groups the repository writes of one operation into one transaction.
+
+    Inside the outermost unit of work repositories only flush; leaving it
+    commits once, or rolls everything back if an exception escapes. Inner
+    units join the outer one, so facade methods can call each other.
+
+    Usage:
+        with UnitOfWork():
+            place_repo.update(...)
+            review_repo.add(...)
+    """
+
+    def __enter__(self):
+        info = db.session.info
+        info[_DEPTH] = info.get(_DEPTH, 0) + 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        info = db.session.info
+        info[_DEPTH] -= 1
+        if info[_DEPTH]:
+            return False
+
+        callbacks = info.pop(_CALLBACKS, [])
+        if exc_type is not None:
+            db.session.rollback()
+            return False
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for callback in callbacks:
+            callback()
+        return False
+
+
+def in_unit_of_work():
+    return db.session.info.get(_DEPTH, 0) > 0
+
+
+def commit_or_flush():
+    """Commit, or only flush when a unit of work will commit later"""
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+@contextmanager
+def savepoint():
+    """Undo only the writes of the block when it raises.
+
+    The exception still propagates; the rest of the unit of work is kept
+    and can go on to commit.
+    """
+    with db.session.begin_nested():
+        yield
+
+
+def after_commit(callback):
+    """Run callback once the current unit of work has committed.
+
+    Outside a unit of work the callback runs immediately; it is dropped if
+    the unit of work rolls back.
+    """
+    if in_unit_of_work():
+        db.session.info.setdefault(_CALLBACKS, []).append(callback)
+    else:
+        callback()
+
+
+def transactional(func):
+    """Run a method inside a UnitOfWork"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with UnitOfWork():
+            return func(*args, **kwargs)
+    return wrapper
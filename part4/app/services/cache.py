@@ -0,0 +1,195 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # optional dependency, only needed for RedisCache
+    redis = None
+
+
+class Cache:
+    """Base class of the facade caches, counting hits and misses.
+
+    Read-through fills race with invalidation: a reader may load a value,
+    a writer commit and delete the key, and the reader then store what it
+    loaded. Readers therefore take generation() before loading and pass it
+    to set(), which stores nothing if any key was deleted in between.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None
+        }
+
+    def _get(self, key):
+        return None
+
+    def generation(self):
+        """Token changing whenever a key is deleted"""
+        return None
+
+    def set(self, key, value, generation=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class NullCache(Cache):
+    """Cache that never stores anything, every lookup is a miss"""
+
+
+class LRUCache(Cache):
+    """In-process least-recently-used cache with a per-entry time to live"""
+
+    def __init__(self, max_entries=1024, ttl=300):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def generation(self):
+        return self._generation
+
+    def set(self, key, value, generation=None):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats['entries'] = len(self._entries)
+        return stats
+
+
+class RedisCache(Cache):
+    """Cache stored in a Redis-compatible server, values encoded as JSON"""
+
+    def __init__(self, url='redis://localhost:6379/0', ttl=300,
+                 prefix='hbnb:'):
+        super().__init__()
+        if redis is None:
+            raise RuntimeError(
+                "The redis package is required for the redis cache backend"
+            )
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    @property
+    def _generation_key(self):
+        return self.prefix + 'generation'
+
+    def generation(self):
+        raw = self.client.get(self._generation_key)
+        return int(raw) if raw is not None else 0
+
+    def set(self, key, value, generation=None):
+        raw = json.dumps(value)
+        if generation is None:
+            self.client.set(self.prefix + key, raw, ex=self.ttl or None)
+            return
+        # The generation is shared by every process using the server: the
+        # WATCH aborts the write if another one deletes a key meanwhile
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self._generation_key)
+                current = pipe.get(self._generation_key)
+                if (int(current) if current is not None else 0) != generation:
+                    return
+                pipe.multi()
+                pipe.set(self.prefix + key, raw, ex=self.ttl or None)
+                pipe.execute()
+            except redis.WatchError:
+                pass
+
+    def delete(self, *keys):
+        if keys:
+            with self.client.pipeline() as pipe:
+                pipe.incr(self._generation_key)
+                pipe.delete(*[self.prefix + key for key in keys])
+                pipe.execute()
+
+    def clear(self):
+        keys = [
+            key for key in self.client.scan_iter(match=self.prefix + '*')
+            if key != self._generation_key.encode('utf-8')
+        ]
+        with self.client.pipeline() as pipe:
+            pipe.incr(self._generation_key)
+            if keys:
+                pipe.delete(*keys)
+            pipe.execute()
+
+
+def create_cache(config):
+    """Build the cache selected by the PLACE_CACHE_* configuration keys"""
+    backend = config.get('PLACE_CACHE_BACKEND', 'memory')
+    ttl = config.get('PLACE_CACHE_TTL', 300)
+    if backend == 'memory':
+        return LRUCache(
+            max_entries=config.get('PLACE_CACHE_MAX_ENTRIES', 1024), ttl=ttl
+        )
+    if backend == 'redis':
+        return RedisCache(
+            url=config.get('PLACE_CACHE_REDIS_URL', 'redis://localhost:6379/0'),
+            ttl=ttl
+        )
+    if backend in (None, 'none'):
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
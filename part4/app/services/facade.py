@@ -1,23 +1,131 @@
 from app.models.user import User
 from app.models.amenity import Amenity
-from app.models.place import Place
-from app.models.review import Review
+from app.models.place import Place, DETAIL_EMBEDS
+from app.models.review import Review, ROW_COLUMNS as REVIEW_COLUMNS
+from datetime import datetime, timezone
+from app.hashing import PasswordHasherBusy
+from sqlalchemy.exc import IntegrityError
+from app.persistence.geo import bbox_around, bbox_center
+from app.persistence.pagination import (
+    MAX_RESULT_WINDOW, decode_offset, encode_offset
+)
 from app.persistence.repository import SQLAlchemyRepository
+from app.persistence.search import (
+    InMemorySearchIndex, create_search_index, tokenize
+)
+from app.persistence.tiered import TieredRepository, WRITE_THROUGH, tiered
+from app.persistence.unit_of_work import after_commit, transactional
+from app.services.cache import LRUCache, create_cache
+from app.services.repositories.place_repository import PlaceRepository
+from app.services.repositories.review_repository import ReviewRepository
 from app.services.repositories.user_repository import UserRepository
 
 
+# Relationships read by Place.to_summary_dict and Place.to_detail_dict
+PLACE_SUMMARY_LOAD = ('owner',)
+PLACE_INCLUDE_LOADS = {
+    'owner': 'owner',
+    'amenities': 'amenities',
+    'reviews': 'reviews.user',
+}
+PLACE_DETAIL_LOAD = tuple(PLACE_INCLUDE_LOADS.values())
+
+# Rows fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+# Repositories served from an in-process tier, by entity, with the
+# consistency mode of their writes (see TieredRepository). Amenities are
+# read on every place write and list and rarely change.
+REPOSITORY_TIERS = {
+    'amenity': WRITE_THROUGH,
+}
+
+
 class HBnBFacade:
-    def __init__(self):
-        self.user_repo = UserRepository()
-        self.amenity_repo = SQLAlchemyRepository(Amenity)
-        self.place_repo = SQLAlchemyRepository(Place)
-        self.review_repo = SQLAlchemyRepository(Review)
+    """Entry point of the business logic.
+
+    Every method that writes runs in one UnitOfWork: the API call commits
+    exactly once, or rolls back entirely when it fails. Cache invalidations
+    wait for that commit.
+    """
+
+    def __init__(self, tiers=None):
+        """tiers maps 'user', 'amenity', 'place' or 'review' to the
+        consistency mode of an in-process tier in front of that repository;
+        defaults to REPOSITORY_TIERS."""
+        tiers = REPOSITORY_TIERS if tiers is None else tiers
+        self.user_repo = tiered(UserRepository(), tiers.get('user'))
+        self.amenity_repo = tiered(
+            SQLAlchemyRepository(Amenity), tiers.get('amenity')
+        )
+        self.place_repo = tiered(PlaceRepository(), tiers.get('place'))
+        self.review_repo = tiered(ReviewRepository(), tiers.get('review'))
+        self.tiers = [
+            repo for repo in (self.user_repo, self.amenity_repo,
+                              self.place_repo, self.review_repo)
+            if isinstance(repo, TieredRepository)
+        ]
+        self.place_cache = LRUCache()
+        self.privilege_cache = LRUCache(ttl=30)
+        self.search_index = InMemorySearchIndex()
+
+    def init_app(self, app):
+        """Configure the facade caches, search index and repository tiers
+        from the application, and warm the tiers whose table exists"""
+        self.place_cache = create_cache(app.config)
+        self.privilege_cache = LRUCache(
+            ttl=app.config.get('IDENTITY_CACHE_TTL', 30)
+        )
+        with app.app_context():
+            self.search_index = create_search_index()
+        for repo in self.tiers:
+            repo.ttl = app.config.get('REPOSITORY_TIER_TTL', repo.ttl)
+            repo.flush_size = app.config.get(
+                'WRITE_BEHIND_FLUSH_SIZE', repo.flush_size
+            )
+            repo.flush_interval = app.config.get(
+                'WRITE_BEHIND_FLUSH_INTERVAL', repo.flush_interval
+            )
+        if not self.tiers:
+            return
+
+        app.teardown_appcontext(self._flush_tiers)
+        with app.app_context():
+            for repo in self.tiers:
+                repo.warm()
+
+    def _flush_tiers(self, exc=None):
+        """Write the write-behind queues that are due, after a request"""
+        if exc is None:
+            for repo in self.tiers:
+                repo.flush_due()
+
+    def get_cache_stats(self):
+        """Return the hit/miss counters of each facade cache, by cache name"""
+        return {
+            'place': self.place_cache.stats(),
+            'privileges': self.privilege_cache.stats()
+        }
+
+    def _invalidate_places(self, *place_ids):
+        """Drop cached place details once the running write has committed"""
+        keys = [f"place:{pid}" for pid in place_ids]
+        after_commit(lambda: self.place_cache.delete(*keys))
+
+    def _index_place(self, place):
+        """Refresh the search document of a place and its reviews"""
+        reviews = self.review_repo.get_rows(
+            ('text',), filters={'place_id': place.id}
+        )
+        self.search_index.index(
+            place.id, place.title, place.description,
+            [row['text'] for row in reviews]
+        )
 
+    @transactional
     def create_user(self, user_data):
-        """create a user"""
+        """create a user (User hashes the password itself)"""
         user = User(**user_data)
-        if 'password' in user_data:
-            user.hash_password(user_data['password'])
         self.user_repo.add(user)
         return user
 
@@ -31,11 +139,78 @@ class HBnBFacade:
             email
         )
 
+    def list_users(self):
+        """Return the id, names, email and is_admin of every user as dicts"""
+        return self.user_repo.get_rows(
+            ('id', 'first_name', 'last_name', 'email', 'is_admin')
+        )
+
+    def get_user_privileges(self, user_id):
+        """Return the is_admin flag and last privilege change of a user.
+
+        The record is cached for IDENTITY_CACHE_TTL seconds; None means
+        the user does not exist.
+        """
+        key = f"privileges:{user_id}"
+        record = self.privilege_cache.get(key)
+        if record is None:
+            generation = self.privilege_cache.generation()
+            row = self.user_repo.get_privileges(user_id)
+            if row is None:
+                return None
+            is_admin, changed_at = row
+            record = {
+                'is_admin': bool(is_admin),
+                'privileges_changed_at': (
+                    changed_at.replace(tzinfo=timezone.utc).timestamp()
+                    if changed_at else None
+                )
+            }
+            self.privilege_cache.set(key, record, generation=generation)
+        return record
+
+    @transactional
+    def authenticate(self, email, password):
+        """Return the user owning these credentials, or None.
+
+        Hashes made with an outdated bcrypt cost are replaced on success,
+        unless the hasher is saturated: the upgrade is then left for a later
+        login rather than failing this one.
+        """
+        user = self.user_repo.get_user_by_email(email)
+        if not user or not user.verify_password(password):
+            return None
+        if user.password_needs_rehash():
+            try:
+                user.hash_password(password)
+            except PasswordHasherBusy:
+                return user
+            self.user_repo.save()
+        return user
+
+    @transactional
     def update_user(self, user_id, updated_data):
         """Update user informations"""
+        if 'password' in updated_data:
+            user = self.user_repo.get(user_id)
+            if user:
+                user.hash_password(updated_data['password'])
+            updated_data = {
+                k: v for k, v in updated_data.items() if k != 'password'
+            }
+        place_ids = []
+        if {'first_name', 'last_name', 'email'} & set(updated_data):
+            place_ids = self.place_repo.get_ids_by_user(user_id)
+            self.place_repo.touch(place_ids)
         self.user_repo.update(user_id, updated_data)
+        self._invalidate_places(*place_ids)
+        if 'is_admin' in updated_data:
+            after_commit(lambda: self.privilege_cache.delete(
+                f"privileges:{user_id}"
+            ))
         return self.user_repo.get(user_id)
 
+    @transactional
     def create_amenity(self, amenity_data):
         """Creates a new amenity with validation.
 
@@ -51,6 +226,10 @@ class HBnBFacade:
         self.amenity_repo.add(amenity)
         return amenity
 
+    def get_amenities_version(self):
+        """Returns (count, latest updated_at) of the amenities."""
+        return self.amenity_repo.get_version()
+
     def get_amenity(self, amenity_id):
         """Retrieves an amenity by its ID."""
         return self.amenity_repo.get(amenity_id)
@@ -59,6 +238,11 @@ class HBnBFacade:
         """Retrieves all available amenities."""
         return self.amenity_repo.get_all()
 
+    def list_amenities(self):
+        """Returns the id and name of every amenity as dicts."""
+        return self.amenity_repo.get_rows(('id', 'name'))
+
+    @transactional
     def update_amenity(self, amenity_id, amenity_data):
         """Updates the information of an existing amenity.
 
@@ -74,12 +258,16 @@ class HBnBFacade:
             return None
 
         if 'name' in amenity_data:
+            place_ids = self.place_repo.get_ids_by_amenity(amenity_id)
+            self.place_repo.touch(place_ids)
             self.amenity_repo.update(
                 amenity_id, {'name': amenity_data['name']}
             )
+            self._invalidate_places(*place_ids)
 
         return self.amenity_repo.get(amenity_id)
 
+    @transactional
     def create_place(self, place_data):
         """Creates a new place with validation of attributes."""
         owner_id = place_data.get("owner_id")
@@ -96,30 +284,241 @@ class HBnBFacade:
         )
 
         if "amenities" in place_data and place_data["amenities"]:
-            for amenity_id in place_data["amenities"]:
-                amenity = self.amenity_repo.get(amenity_id)
-                if amenity:
-                    place.add_amenity(amenity)
+            place.set_amenities(
+                self.amenity_repo.get_many(place_data["amenities"])
+            )
 
         self.place_repo.add(place)
+        self._index_place(place)
         return place.to_dict()
 
-    def get_place_by_id(self, place_id):
-        """Retrieves a place by ID, including its owner and amenities."""
-        place = self.place_repo.get(place_id)
-        if not place:
-            return None
+    def get_place_by_id(self, place_id, include=None, fields=None):
+        """Retrieves a place by ID, including its owner and amenities.
 
-        place.owner = self.user_repo.get(place.owner_id)
+        Args:
+            place_id (str): ID of the place
+            include (list): Relationships to embed among owner, amenities
+                and reviews; by default the ones named in fields, or all
+                of them when fields is not given either
+            fields (list): Keys to return besides id and the embedded
+                relationships; unknown keys are ignored
 
-        return place.to_detail_dict()
+        Returns:
+            dict: The place detail, or None if the place does not exist
+
+        Raises:
+            ValueError: If include names an unknown relationship
+
+        Full details are served from the place cache when possible; a
+        partial detail missing from the cache loads only what it embeds.
+        """
+        if include is not None and fields is not None:
+            # Explicitly included relationships need not be listed in fields
+            fields = set(fields).union(
+                *[DETAIL_EMBEDS.get(name, ()) for name in include]
+            )
+        include = self._place_includes(include, fields)
+        key = f"place:{place_id}"
+        detail = self.place_cache.get(key)
+        if detail is None:
+            generation = self.place_cache.generation()
+            place = self.place_repo.get(
+                place_id,
+                load=tuple(PLACE_INCLUDE_LOADS[name] for name in include)
+            )
+            if not place:
+                return None
+            detail = place.to_detail_dict(include)
+            if len(include) == len(DETAIL_EMBEDS):
+                self.place_cache.set(key, detail, generation=generation)
+
+        if len(include) == len(DETAIL_EMBEDS) and fields is None:
+            return detail
+        return self._project_place(detail, include, fields)
+
+    @staticmethod
+    def _place_includes(include, fields):
+        if include is None:
+            if fields is None:
+                return tuple(DETAIL_EMBEDS)
+            return tuple(
+                name for name, keys in DETAIL_EMBEDS.items()
+                if set(keys) & set(fields)
+            )
+        unknown = set(include) - set(DETAIL_EMBEDS)
+        if unknown:
+            raise ValueError(
+                f"Cannot include {', '.join(sorted(unknown))}; "
+                f"choose among {', '.join(DETAIL_EMBEDS)}"
+            )
+        return tuple(name for name in DETAIL_EMBEDS if name in include)
+
+    @staticmethod
+    def _project_place(detail, include, fields):
+        """Keep the requested keys of a place detail"""
+        omitted = {
+            key for name, keys in DETAIL_EMBEDS.items()
+            if name not in include for key in keys
+        }
+        return {
+            key: value for key, value in detail.items()
+            if key not in omitted
+            and (fields is None or key == 'id' or key in fields)
+        }
 
     def get_all_places(self):
-        places = self.place_repo.get_all()
-        for place in places:
-            place.owner = self.user_repo.get(place.owner_id)
-        return [place.to_summary_dict() for place in places]
+        """Returns the summary of every place, built without ORM objects."""
+        return [
+            Place.summary_from_row(row)
+            for row in self.place_repo.get_summary_rows()
+        ]
+
+    def export_places(self, batch_size=EXPORT_BATCH_SIZE):
+        """Yields the dict of every place, fetching batch_size rows at a time."""
+        for place in self.place_repo.iter_all(batch_size):
+            yield place.to_dict()
+
+    def get_places_version(self):
+        """Returns (count, latest updated_at) of the places."""
+        return self.place_repo.get_version()
+
+    def get_places_page(self, limit, cursor=None, min_price=None,
+                        max_price=None, sort=None):
+        """Retrieves one keyset-paginated page of place summaries.
+
+        Args:
+            limit (int): Maximum number of places to return
+            cursor (str): Opaque cursor returned with the previous page
+            min_price (float): Lowest price per night to include
+            max_price (float): Highest price per night to include
+            sort (str): 'rating' for the best rated places first, oldest
+                places first by default
+
+        Returns:
+            dict: The page of places and the cursor of the next page
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        get_page = (self.place_repo.get_page_by_rating if sort == 'rating'
+                    else self.place_repo.get_page)
+        places, next_cursor = get_page(
+            limit, cursor, load=PLACE_SUMMARY_LOAD,
+            ranges=self._price_ranges(min_price, max_price)
+        )
+        return {
+            'places': [place.to_summary_dict() for place in places],
+            'next_cursor': next_cursor
+        }
+
+    def search_places_in_bbox(self, south, west, north, east, limit,
+                              cursor=None, min_price=None, max_price=None):
+        """Retrieves a page of the places inside a bounding box, nearest to
+        its center first.
+
+        Args:
+            south, west, north, east (float): Edges of the box in degrees;
+                west > east describes a box crossing the antimeridian
+            limit (int): Maximum number of places to return
+            cursor (str): Opaque cursor returned with the previous page
+
+        Returns:
+            dict: The places sorted by distance to the center of the box,
+            each with its distance_km, and the cursor of the next page
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        latitude, longitude = bbox_center(south, west, north, east)
+        return self._places_by_distance(
+            latitude, longitude, (south, west, north, east), limit, cursor,
+            self._price_ranges(min_price, max_price)
+        )
+
+    def search_places_nearby(self, latitude, longitude, radius_km, limit,
+                             cursor=None, min_price=None, max_price=None):
+        """Retrieves a page of the places within radius_km of a position,
+        nearest first.
 
+        Returns:
+            dict: The places sorted by distance, each with its distance_km,
+            and the cursor of the next page
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        return self._places_by_distance(
+            latitude, longitude, bbox_around(latitude, longitude, radius_km),
+            limit, cursor, self._price_ranges(min_price, max_price),
+            radius_km
+        )
+
+    def search_places(self, query, limit, cursor=None):
+        """Full-text search over place titles, descriptions and reviews.
+
+        Args:
+            query (str): Words that must all appear in a place's title,
+                description or review text
+            limit (int): Maximum number of places to return
+            cursor (str): Opaque cursor returned with the previous page
+
+        Returns:
+            dict: Place summaries, best match first, each with its BM25
+            score, and the cursor of the next page
+
+        Raises:
+            ValueError: If the query has no word or the cursor is invalid
+        """
+        terms = tokenize(query)
+        if not terms:
+            raise ValueError("q must contain at least one word")
+        offset = decode_offset(cursor) if cursor else 0
+        hits = self.search_index.search(terms, limit + 1, offset)
+        page = hits[:limit]
+        places = {
+            place.id: place for place in self.place_repo.get_many(
+                [place_id for place_id, _ in page], load=PLACE_SUMMARY_LOAD
+            )
+        }
+        results = []
+        for place_id, score in page:
+            if place_id in places:
+                summary = places[place_id].to_summary_dict()
+                summary['score'] = score
+                results.append(summary)
+        return {
+            'places': results,
+            'next_cursor': (encode_offset(offset + limit)
+                            if len(hits) > limit
+                            and offset + limit <= MAX_RESULT_WINDOW
+                            else None)
+        }
+
+    @transactional
+    def rebuild_search_index(self):
+        """Rebuild the search documents of every place from the database"""
+        self.search_index.rebuild()
+
+    @staticmethod
+    def _price_ranges(min_price, max_price):
+        if min_price is None and max_price is None:
+            return {}
+        return {'price': (min_price, max_price)}
+
+    def _places_by_distance(self, latitude, longitude, bbox, limit, cursor,
+                            ranges, radius_km=None):
+        rows, next_cursor = self.place_repo.get_page_by_distance(
+            latitude, longitude, bbox, limit, cursor,
+            load=PLACE_SUMMARY_LOAD, ranges=ranges, radius_km=radius_km
+        )
+        results = []
+        for place, distance in rows:
+            summary = place.to_summary_dict()
+            summary['distance_km'] = round(distance, 3)
+            results.append(summary)
+        return {'places': results, 'next_cursor': next_cursor}
+
+    @transactional
     def update_place(self, place_id, place_data):
         """Updates a place's details while ensuring data integrity."""
         place = self.place_repo.get(place_id)
@@ -149,17 +548,19 @@ class HBnBFacade:
         place = self.place_repo.get(place_id)
 
         if "amenities" in place_data:
-            place.amenities = []
-            for amenity_id in place_data["amenities"]:
-                amenity = self.amenity_repo.get(amenity_id)
-                if amenity:
-                    place.add_amenity(amenity)
-
+            place.set_amenities(
+                self.amenity_repo.get_many(place_data["amenities"])
+            )
+            place.updated_at = datetime.utcnow()
             self.place_repo.add(place)
 
+        if {'title', 'description'} & set(update_data):
+            self._index_place(place)
+        self._invalidate_places(place_id)
         return True
 
 
+    @transactional
     def create_review(self, review_data):
         """
         Create a new review with validation.
@@ -203,9 +604,30 @@ class HBnBFacade:
             )
 
         review = Review(**review_data)
-        self.review_repo.add(review)
+        self.place_repo.adjust_rating_aggregates(place.id, 1, review.rating)
+        try:
+            self.review_repo.add(review)
+        except IntegrityError as e:
+            if not self.review_repo.is_duplicate_review(e):
+                raise
+            raise ValueError("You have already reviewed this place")
+        self._index_place(place)
+        self._invalidate_places(review.place_id)
         return review
 
+    def has_user_reviewed_place(self, user_id, place_id):
+        """
+        Check whether a user already reviewed a place.
+
+        Args:
+            user_id (str): ID of the user
+            place_id (str): ID of the place
+
+        Returns:
+            bool: True if a review by this user exists for the place
+        """
+        return self.review_repo.has_reviewed(user_id, place_id)
+
     def get_review(self, review_id):
         """
         Retrieve a review by ID.
@@ -227,29 +649,74 @@ class HBnBFacade:
         """
         return self.review_repo.get_all()
 
-    def get_reviews_by_place(self, place_id):
+    def export_reviews(self, place_id=None, batch_size=EXPORT_BATCH_SIZE):
+        """
+        Yield the dict of every review, fetching batch_size rows at a time.
+
+        Args:
+            place_id (str): Restrict to the reviews of this place
+            batch_size (int): Rows fetched per database round trip
+
+        Returns:
+            generator: One review dict at a time
+        """
+        filters = {'place_id': place_id} if place_id else None
+        for review in self.review_repo.iter_all(batch_size, filters=filters):
+            yield review.to_dict()
+
+    def list_reviews(self):
+        """
+        Retrieve the dict of every review, built without ORM objects.
+
+        Returns:
+            list: One Review.to_dict-shaped dict per review
+        """
+        return [
+            Review.from_row(row)
+            for row in self.review_repo.get_rows(REVIEW_COLUMNS)
+        ]
+
+    def get_reviews_version(self, place_id=None):
+        """
+        Return (count, latest updated_at) of the reviews.
+
+        Args:
+            place_id (str): Restrict to the reviews of this place
+
+        Returns:
+            tuple: Number of reviews and their latest modification time
         """
-        Retrieve all reviews for a specific place.
+        filters = {'place_id': place_id} if place_id else None
+        return self.review_repo.get_version(filters)
+
+    def get_reviews_by_place(self, place_id, limit, cursor=None):
+        """
+        Retrieve one page of the reviews of a specific place.
 
         Args:
             place_id (str): ID of the place
+            limit (int): Maximum number of reviews to return
+            cursor (str): Opaque cursor returned with the previous page
 
         Returns:
-            list: List of reviews for the place
+            dict: The page of reviews and the cursor of the next page
 
         Raises:
-            ValueError: If place does not exist
+            ValueError: If place does not exist or the cursor is invalid
         """
         place = self.place_repo.get(place_id)
         if not place:
             raise ValueError(f"Place with id {place_id} does not exist")
 
-        all_reviews = self.review_repo.get_all()
-        return [
-            review for review in all_reviews
-            if review.place_id == place_id
-        ]
+        reviews, next_cursor = self.review_repo.get_page(
+            limit, cursor, filters={'place_id': place_id}
+        )
+        return {
+            'reviews': [review.to_dict() for review in reviews],
+            'next_cursor': next_cursor
+        }
 
+    @transactional
     def update_review(self, review_id, review_data):
         """
         Update a review.
@@ -268,6 +735,7 @@ class HBnBFacade:
         if not review:
             raise ValueError(f"Review with id {review_id} does not exist")
 
+        rating_delta = 0
         if 'rating' in review_data:
             try:
                 rating = float(review_data['rating'])
@@ -277,9 +745,26 @@ class HBnBFacade:
             except (ValueError, TypeError):
                 raise ValueError("rating must be a number between 0 and 5")
 
+            rating_delta = (
+                review.validate_rating('rating', rating) - review.rating
+            )
+
+        # The place detail embeds the review: its updated_at moves as well
+        if rating_delta:
+            self.place_repo.adjust_rating_aggregates(
+                review.place_id, 0, rating_delta
+            )
+        else:
+            self.place_repo.touch([review.place_id])
+
+        place_id = review.place_id
         self.review_repo.update(review_id, review_data)
+        if 'text' in review_data:
+            self._index_place(self.place_repo.get(place_id))
+        self._invalidate_places(place_id)
         return self.review_repo.get(review_id)
 
+    @transactional
     def delete_review(self, review_id):
         """
         Delete a review.
@@ -297,5 +782,23 @@ class HBnBFacade:
         if not review:
             raise ValueError(f"Review with id {review_id} does not exist")
 
+        self.place_repo.adjust_rating_aggregates(
+            review.place_id, -1, -review.rating
+        )
+        place_id = review.place_id
         self.review_repo.delete(review_id)
+        self._index_place(self.place_repo.get(place_id))
+        self._invalidate_places(place_id)
         return True
+
+    @transactional
+    def recompute_rating_aggregates(self):
+        """
+        Rebuild the review_count and rating_sum of every place.
+
+        Returns:
+            int: Number of places updated
+        """
+        updated = self.place_repo.recompute_rating_aggregates()
+        after_commit(self.place_cache.clear)
+        return updated
@@ -0,0 +1,349 @@
+import csv
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from app.hashing import is_bcrypt_hash
+from app.models.user import User
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from sqlalchemy.exc import IntegrityError
+from app.persistence.unit_of_work import UnitOfWork, savepoint
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Import order: a record may only reference records of the earlier kinds
+IMPORT_ORDER = ('users', 'amenities', 'places', 'reviews')
+
+# Separator of the amenities column of place CSV files
+CSV_LIST_SEPARATOR = ';'
+
+
+def read_records(path, fmt=None):
+    """Stream (line number, record, error) triples from an NDJSON or CSV file.
+
+    The format defaults to the file extension: .csv is CSV, anything else
+    is read as one JSON object per line. Empty CSV cells are dropped so
+    the model defaults apply. A line that cannot be parsed yields a None
+    record and the parse error.
+    """
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, newline='', encoding='utf-8') as stream:
+        if fmt == 'csv':
+            for line_no, row in enumerate(csv.DictReader(stream), start=2):
+                yield line_no, {
+                    key: value for key, value in row.items()
+                    if key and value not in (None, '')
+                }, None
+            return
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, None, f"invalid JSON: {e.msg}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "a record must be a JSON object"
+                continue
+            yield line_no, record, None
+
+
+class ImportReport:
+    """Counters of one imported file"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        """Imported rows per second"""
+        elapsed = self.elapsed
+        return self.imported / elapsed if elapsed else 0.0
+
+    def reject(self, line_no, message):
+        self.rejected += 1
+        self.errors.append((line_no, message))
+
+
+class BulkImporter:
+    """Loads users, amenities, places and reviews from exported files.
+
+    Every record goes through the model constructor, so the same
+    validators as the API apply, and is then inserted with one executemany
+    per batch of batch_size rows, each batch in its own UnitOfWork.
+    Records keep their "id" when they have one. References (owner_id,
+    user_id, place_id, amenities) are resolved through in-memory id maps
+    holding both the stored rows and the rows imported so far; users may
+    also be referenced by email (owner_email, user_email) and amenities by
+    name. A row enters the id maps only once its batch is committed. A
+    batch the database rejects is retried row by row, so that only the
+    offending rows are skipped. Invalid records are reported and skipped.
+    """
+
+    def __init__(self, facade, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        self.facade = facade
+        self.batch_size = batch_size
+        self.progress = progress
+        self._maps_loaded = False
+
+    def _load_id_maps(self):
+        if self._maps_loaded:
+            return
+        self.user_ids = set()
+        self.user_emails = {}
+        for user_id, email in self.facade.user_repo.iter_keys('id', 'email'):
+            self.user_ids.add(user_id)
+            self.user_emails[email.lower()] = user_id
+        self.amenity_ids = set()
+        self.amenity_names = {}
+        for amenity_id, name in self.facade.amenity_repo.iter_keys(
+                'id', 'name'):
+            self.amenity_ids.add(amenity_id)
+            self.amenity_names[name] = amenity_id
+        # Place id -> owner id, to refuse reviews written by the owner
+        self.place_ids = dict(
+            self.facade.place_repo.iter_keys('id', 'owner_id')
+        )
+        self.reviewed = set(
+            self.facade.review_repo.iter_keys('user_id', 'place_id')
+        )
+        self._maps_loaded = True
+
+    def import_file(self, kind, path, fmt=None):
+        """Import one file of the given kind and return its ImportReport"""
+        if kind not in IMPORT_ORDER:
+            raise ValueError(f"Unknown record kind: {kind}")
+        self._load_id_maps()
+        build, repo = {
+            'users': (self._build_user, self.facade.user_repo),
+            'amenities': (self._build_amenity, self.facade.amenity_repo),
+            'places': (self._build_place, self.facade.place_repo),
+            'reviews': (self._build_review, self.facade.review_repo),
+        }[kind]
+
+        report = ImportReport(kind)
+        batch = []
+        for line_no, record, error in read_records(path, fmt):
+            if error is None:
+                try:
+                    row, row_links = build(record)
+                except (ValueError, TypeError, KeyError) as e:
+                    error = str(e)
+            if error is not None:
+                report.reject(line_no, error)
+                continue
+            batch.append((line_no, row, row_links))
+            if len(batch) >= self.batch_size:
+                self._flush(kind, repo, batch, report)
+                batch = []
+        self._flush(kind, repo, batch, report)
+
+        if kind == 'reviews' and report.imported:
+            self.facade.recompute_rating_aggregates()
+        return report
+
+    def _flush(self, kind, repo, batch, report):
+        if not batch:
+            return
+        with UnitOfWork():
+            try:
+                with savepoint():
+                    self._insert(repo, batch)
+                inserted = batch
+            except IntegrityError:
+                inserted = []
+                for entry in batch:
+                    try:
+                        with savepoint():
+                            self._insert(repo, [entry])
+                    except IntegrityError as e:
+                        report.reject(
+                            entry[0], f"rejected by the database: {e.orig}"
+                        )
+                    else:
+                        inserted.append(entry)
+        for _, row, _ in inserted:
+            self._register(kind, row)
+        report.imported += len(inserted)
+        if self.progress:
+            self.progress(report)
+
+    def _insert(self, repo, batch):
+        repo.bulk_insert([row for _, row, _ in batch])
+        self.facade.place_repo.link_amenities(
+            [link for _, _, row_links in batch for link in row_links]
+        )
+
+    def _register(self, kind, row):
+        """Add a committed row to the id maps"""
+        if kind == 'users':
+            self.user_ids.add(row['id'])
+            self.user_emails[row['email'].lower()] = row['id']
+        elif kind == 'amenities':
+            self.amenity_ids.add(row['id'])
+            self.amenity_names[row['name']] = row['id']
+        elif kind == 'places':
+            self.place_ids[row['id']] = row['owner_id']
+        else:
+            self.reviewed.add((row['user_id'], row['place_id']))
+
+    @staticmethod
+    def _row(obj, record):
+        """Column dict of a validated model object, ready for executemany"""
+        now = datetime.utcnow()
+        obj.id = record.get('id') or str(uuid.uuid4())
+        obj.created_at = _parse_datetime(record.get('created_at')) or now
+        obj.updated_at = (
+            _parse_datetime(record.get('updated_at')) or obj.created_at
+        )
+        return {
+            column.key: getattr(obj, column.key)
+            for column in obj.__table__.columns
+        }
+
+    def _check_new_id(self, record, known_ids):
+        if record.get('id') in known_ids:
+            raise ValueError(f"id {record['id']} already exists")
+
+    def _build_user(self, record):
+        self._check_new_id(record, self.user_ids)
+        email = record.get('email')
+        if email and email.lower() in self.user_emails:
+            raise ValueError(f"email {email} already exists")
+        password = record.get('password')
+        if not password:
+            raise ValueError("password is required")
+        user = User(
+            first_name=record.get('first_name'),
+            last_name=record.get('last_name'),
+            email=email,
+            is_admin=_parse_bool(record.get('is_admin', False))
+        )
+        # Exported hashes are kept, plain passwords are hashed like the API.
+        # A value that only looks like a hash would lock the account out.
+        if password.startswith('$2'):
+            if not is_bcrypt_hash(password):
+                raise ValueError("password is not a valid bcrypt hash")
+            user.password = password
+        else:
+            user.hash_password(password)
+        return self._row(user, record), []
+
+    def _build_amenity(self, record):
+        self._check_new_id(record, self.amenity_ids)
+        name = record.get('name')
+        if name in self.amenity_names:
+            raise ValueError(f"amenity {name} already exists")
+        amenity = Amenity(name=name)
+        return self._row(amenity, record), []
+
+    def _build_place(self, record):
+        self._check_new_id(record, self.place_ids)
+        place = Place(
+            title=record.get('title'),
+            description=record.get('description', ""),
+            price=_parse_number(record.get('price'), 'price'),
+            latitude=_parse_number(record.get('latitude'), 'latitude'),
+            longitude=_parse_number(record.get('longitude'), 'longitude'),
+            owner_id=self._resolve_user(record, 'owner')
+        )
+        amenity_ids = [
+            self._resolve_amenity(ref)
+            for ref in _parse_list(record.get('amenities'))
+        ]
+        row = self._row(place, record)
+        return row, [
+            (row['id'], amenity_id)
+            for amenity_id in dict.fromkeys(amenity_ids)
+        ]
+
+    def _build_review(self, record):
+        user_id = self._resolve_user(record, 'user')
+        place_id = record.get('place_id')
+        if place_id not in self.place_ids:
+            raise ValueError(f"Place with id {place_id} does not exist")
+        if self.place_ids[place_id] == user_id:
+            raise ValueError("You cannot review your own place")
+        if (user_id, place_id) in self.reviewed:
+            raise ValueError("user already reviewed this place")
+        review = Review(
+            text=record.get('text'),
+            rating=record.get('rating'),
+            place_id=place_id,
+            user_id=user_id
+        )
+        return self._row(review, record), []
+
+    def _resolve_user(self, record, role):
+        """Return the id of the user referenced by <role>_id or <role>_email"""
+        user_id = record.get(f'{role}_id')
+        if user_id:
+            if user_id not in self.user_ids:
+                raise ValueError(f"User with id {user_id} does not exist")
+            return user_id
+        email = record.get(f'{role}_email')
+        if email:
+            user_id = self.user_emails.get(email.lower())
+            if user_id is None:
+                raise ValueError(f"User with email {email} does not exist")
+            return user_id
+        raise ValueError(f"{role}_id or {role}_email is required")
+
+    def _resolve_amenity(self, ref):
+        if ref in self.amenity_ids:
+            return ref
+        if ref in self.amenity_names:
+            return self.amenity_names[ref]
+        raise ValueError(f"Amenity {ref} does not exist")
+
+
+def _parse_number(value, name):
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a number")
+    return value
+
+
+def _parse_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def _parse_list(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(CSV_LIST_SEPARATOR)
+                if item.strip()]
+    return list(value)
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid timestamp: {value}")
+    # Timestamps are stored as naive UTC
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
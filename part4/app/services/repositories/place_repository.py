@@ -0,0 +1,201 @@
+import math
+from datetime import datetime
+from sqlalchemy import and_, case, func, insert, or_, select, update
+from app import db
+from app.models.place import (
+    Place, RATING_KEY, SUMMARY_COLUMNS, place_amenity
+)
+from app.models.review import Review
+from app.models.user import User
+from app.persistence.geo import KM_PER_DEGREE, cells_for_bbox
+from app.persistence.pagination import decode_key_cursor, encode_key_cursor
+from app.persistence.repository import SQLAlchemyRepository
+from app.persistence.unit_of_work import commit_or_flush
+
+
+class PlaceRepository(SQLAlchemyRepository):
+    """Repository for Place model"""
+
+    def __init__(self):
+        super().__init__(Place)
+
+    def _filter_bbox(self, query, south, west, north, east):
+        """Restrict a query to the places inside a bounding box.
+
+        The grid-cell index narrows the candidates, the coordinate filters
+        then drop the places outside the box. A west edge greater than the
+        east edge means the box crosses the antimeridian.
+        """
+        cells = cells_for_bbox(south, west, north, east)
+        if cells is not None:
+            query = query.filter(self.model.grid_cell.in_(cells))
+        query = query.filter(self.model.latitude.between(south, north))
+        if west <= east:
+            return query.filter(self.model.longitude.between(west, east))
+        return query.filter(or_(
+            self.model.longitude >= west,
+            self.model.longitude <= east
+        ))
+
+    def get_in_bbox(self, south, west, north, east, load=None, ranges=None):
+        """Find the places inside a bounding box"""
+        query = self._filter_bbox(self._query(load), south, west, north, east)
+        return self._apply_ranges(query, ranges).all()
+
+    def _squared_distance(self, latitude, longitude):
+        """SQL expression of the squared distance from a position, in km².
+
+        Equirectangular: longitude differences, wrapped at the antimeridian,
+        are scaled by the cosine of the reference latitude. Plain
+        arithmetic, so any database can filter and sort on it.
+        """
+        d_lat = (self.model.latitude - latitude) * KM_PER_DEGREE
+        d_lng = func.abs(self.model.longitude - longitude)
+        d_lng = case((d_lng > 180, 360 - d_lng), else_=d_lng) * (
+            KM_PER_DEGREE * math.cos(math.radians(latitude))
+        )
+        return d_lat * d_lat + d_lng * d_lng
+
+    def get_page_by_distance(self, latitude, longitude, bbox, limit,
+                             cursor=None, load=None, ranges=None,
+                             radius_km=None):
+        """Find one page of the places inside a box, nearest first.
+
+        The database filters, orders and limits on the equirectangular
+        distance to (latitude, longitude), close to the great-circle one
+        over the areas the API lets a search cover. Pages continue from a
+        (distance, id) keyset cursor.
+
+        Returns:
+            tuple: A list of (place, distance in km) and the cursor of the
+            next page, None on the last page
+        """
+        distance = self._squared_distance(latitude, longitude)
+        query = self._apply_ranges(
+            self._filter_bbox(self._query(load), *bbox), ranges
+        )
+        if radius_km is not None:
+            query = query.filter(distance <= radius_km * radius_km)
+        if cursor:
+            after, obj_id = decode_key_cursor(cursor)
+            query = query.filter(or_(
+                distance > after,
+                and_(distance == after, self.model.id > obj_id)
+            ))
+        rows = query.add_columns(distance).order_by(
+            distance, self.model.id
+        ).limit(limit + 1).all()
+        page = rows[:limit]
+        next_cursor = (encode_key_cursor(page[-1][1], page[-1][0].id)
+                       if len(rows) > limit else None)
+        return [
+            (place, math.sqrt(squared)) for place, squared in page
+        ], next_cursor
+
+    def get_page_by_rating(self, limit, cursor=None, load=None, ranges=None):
+        """Find one page of places, best average rating first.
+
+        Places without reviews come last. Ties are broken by id, and pages
+        continue from a (rating, id) keyset cursor; both directions are
+        descending so that ix_places_rating_id serves the order.
+        """
+        query = self._apply_ranges(self._query(load), ranges)
+        if cursor:
+            after, obj_id = decode_key_cursor(cursor)
+            query = query.filter(or_(
+                RATING_KEY < after,
+                and_(RATING_KEY == after, self.model.id < obj_id)
+            ))
+        rows = query.add_columns(RATING_KEY).order_by(
+            RATING_KEY.desc(), self.model.id.desc()
+        ).limit(limit + 1).all()
+        page = rows[:limit]
+        next_cursor = (encode_key_cursor(page[-1][1], page[-1][0].id)
+                       if len(rows) > limit else None)
+        return [place for place, _ in page], next_cursor
+
+    def get_summary_rows(self):
+        """Return the summary columns of every place with its owner's name.
+
+        One SELECT with an outer join to users; rows are returned as dicts
+        and no Place or User object is created.
+        """
+        names = SUMMARY_COLUMNS + ('owner_first_name', 'owner_last_name')
+        query = select(
+            *[getattr(self.model, name) for name in SUMMARY_COLUMNS],
+            User.first_name, User.last_name
+        ).outerjoin(User, self.model.owner_id == User.id)
+        return [dict(zip(names, row)) for row in db.session.execute(query)]
+
+    def get_ids_by_amenity(self, amenity_id):
+        """Return the ids of the places offering an amenity"""
+        return [
+            row.place_id for row in db.session.execute(
+                select(place_amenity.c.place_id)
+                .where(place_amenity.c.amenity_id == amenity_id)
+            )
+        ]
+
+    def get_ids_by_user(self, user_id):
+        """Return the ids of the places owned or reviewed by a user"""
+        owned = select(self.model.id).where(self.model.owner_id == user_id)
+        reviewed = select(Review.place_id).where(Review.user_id == user_id)
+        return [
+            row[0] for row in db.session.execute(owned.union(reviewed))
+        ]
+
+    def link_amenities(self, pairs):
+        """Insert (place_id, amenity_id) links with one executemany"""
+        if pairs:
+            db.session.execute(insert(place_amenity), [
+                {'place_id': place_id, 'amenity_id': amenity_id}
+                for place_id, amenity_id in pairs
+            ])
+            commit_or_flush()
+
+    def touch(self, place_ids):
+        """Bump updated_at of places whose embedded data changes.
+
+        Runs inside the current unit of work, so the new timestamp is
+        committed together with the change that caused it.
+        """
+        if not place_ids:
+            return
+        self.model.query.filter(self.model.id.in_(place_ids)).update(
+            {self.model.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+
+    def adjust_rating_aggregates(self, place_id, count_delta, sum_delta):
+        """Shift the review aggregates of a place inside the current transaction.
+
+        The increment is computed by the database so concurrent reviews
+        cannot overwrite each other; it is committed by the caller's unit
+        of work, together with the review change itself.
+        """
+        self.model.query.filter(self.model.id == place_id).update({
+            self.model.review_count: self.model.review_count + count_delta,
+            self.model.rating_sum: self.model.rating_sum + sum_delta
+        })
+
+    def recompute_rating_aggregates(self):
+        """Rebuild the review aggregates of every place in one statement"""
+        places = self.model.__table__
+        reviews = Review.__table__
+        review_count = (
+            select(func.count())
+            .where(reviews.c.place_id == places.c.id)
+            .scalar_subquery()
+        )
+        rating_sum = (
+            select(func.coalesce(func.sum(reviews.c.rating), 0))
+            .where(reviews.c.place_id == places.c.id)
+            .scalar_subquery()
+        )
+        result = db.session.execute(
+            update(places).values(
+                review_count=review_count, rating_sum=rating_sum
+            )
+        )
+        commit_or_flush()
+        return result.rowcount
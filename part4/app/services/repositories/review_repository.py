@@ -0,0 +1,31 @@
+from sqlalchemy import exists
+from app import db
+from app.models.review import Review
+from app.persistence.repository import SQLAlchemyRepository
+
+
+class ReviewRepository(SQLAlchemyRepository):
+    """Repository for Review model"""
+
+    def __init__(self):
+        super().__init__(Review)
+
+    @staticmethod
+    def is_duplicate_review(error):
+        """Tell whether an IntegrityError was raised by uq_reviews_user_place.
+
+        PostgreSQL and MySQL name the constraint in their message, SQLite
+        lists its columns instead.
+        """
+        message = str(error.orig)
+        return ('uq_reviews_user_place' in message
+                or 'reviews.user_id, reviews.place_id' in message)
+
+    def has_reviewed(self, user_id, place_id):
+        """Tell whether a user already reviewed a place (one index probe)"""
+        return db.session.query(
+            exists().where(
+                self.model.user_id == user_id,
+                self.model.place_id == place_id
+            )
+        ).scalar()
@@ -1,5 +1,6 @@
 from app.models.user import User
 from app.persistence.repository import SQLAlchemyRepository
+from app.persistence.unit_of_work import commit_or_flush
 
 
 class UserRepository(SQLAlchemyRepository):
@@ -12,7 +13,12 @@ class UserRepository(SQLAlchemyRepository):
         """Find a user by their email address"""
         return self.model.query.filter_by(email=email).first()
 
+    def get_privileges(self, user_id):
+        """Return the (is_admin, privileges_changed_at) row of a user"""
+        return self.model.query.with_entities(
+            self.model.is_admin, self.model.privileges_changed_at
+        ).filter_by(id=user_id).first()
+
     def save(self):
         """Save changes to the database"""
-        from app import db
-        db.session.commit()
+        commit_or_flush()
@@ -0,0 +1,90 @@
+"""Shared helpers for the benchmark scripts.
+
+The scripts are run as modules from the part4 directory, for example:
+    python -m benchmarks.listing_queries
+"""
+import random
+from config import TestingConfig
+from app import create_app, db
+from app.hashing import _hash_password
+from app.models.user import User
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+
+
+class BenchmarkConfig(TestingConfig):
+    DEBUG = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+def make_app(config_class=BenchmarkConfig):
+    """Create an application bound to a fresh database"""
+    app = create_app(config_class)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(users=10, places=100, amenities=10, reviews_per_place=0,
+         rng=None):
+    """Insert synthetic rows and return their ids grouped by model.
+
+    Must be called inside an application context. Passwords are hashed
+    once and shared by every seeded user.
+    """
+    rng = rng or random.Random(0)
+    password = _hash_password('password', 4)
+    offset = User.query.count()
+
+    user_objs = []
+    for i in range(offset, offset + users):
+        user = User(f'First{i}', f'Last{i}', f'user{i}@bench.io')
+        user.password = password
+        user_objs.append(user)
+    db.session.add_all(user_objs)
+
+    amenity_offset = Amenity.query.count()
+    amenity_objs = [
+        Amenity(f'Amenity {i}')
+        for i in range(amenity_offset, amenity_offset + amenities)
+    ]
+    db.session.add_all(amenity_objs)
+    db.session.flush()
+
+    all_users = user_objs or User.query.all()
+    place_objs = []
+    for i in range(places):
+        place = Place(
+            title=f'Place {i}',
+            description=f'Synthetic place number {i}',
+            price=round(rng.uniform(10, 500), 2),
+            latitude=rng.uniform(-90, 90),
+            longitude=rng.uniform(-180, 180),
+            owner_id=rng.choice(all_users).id
+        )
+        place_objs.append(place)
+    db.session.add_all(place_objs)
+    db.session.flush()
+
+    review_objs = []
+    for place in place_objs:
+        reviewers = rng.sample(
+            all_users, min(reviews_per_place, len(all_users))
+        )
+        for user in reviewers:
+            review_objs.append(Review(
+                text=f'Review of {place.title}',
+                rating=rng.randint(1, 5),
+                place_id=place.id,
+                user_id=user.id
+            ))
+    db.session.add_all(review_objs)
+    db.session.commit()
+
+    return {
+        'users': [u.id for u in user_objs],
+        'amenities': [a.id for a in amenity_objs],
+        'places': [p.id for p in place_objs],
+        'reviews': [r.id for r in review_objs]
+    }
@@ -0,0 +1,341 @@
+"""Benchmark every API route against a seeded database.
+
+Creates the application with create_app('testing') on a temporary SQLite
+file, seeds it, then sends each route of app/api/v1 --requests times
+through the Flask test client. For every endpoint it records the p50, p95
+and p99 latency, the SQL statements per request and the peak memory
+allocated while serving one request (tracemalloc, measured on separate
+warm-up requests so it does not skew the timings).
+
+Results are written as JSON. Given a --baseline file from an earlier run,
+the script exits with status 1 when an endpoint regresses beyond the
+thresholds.
+
+Usage:
+    python -m benchmarks.endpoints [--users 200] [--places 2000]
+        [--amenities 20] [--reviews-per-place 3] [--requests 50]
+        [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+
+LOGIN_PASSWORD = 'password'
+
+
+class Endpoint:
+    """One request template; url and body are called with the request number"""
+
+    def __init__(self, name, method, url, body=None, token=None, status=200,
+                 headers=None, on_response=None):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.body = body
+        self.token = token
+        self.status = status
+        self.headers = headers or {}
+        self.on_response = on_response
+
+    def send(self, client, i):
+        headers = dict(self.headers)
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        response = client.open(
+            self.url(i) if callable(self.url) else self.url,
+            method=self.method,
+            json=self.body(i) if callable(self.body) else self.body,
+            headers=headers
+        )
+        # Consume streamed bodies so their queries are part of the request
+        response.get_data()
+        if response.status_code != self.status:
+            raise AssertionError(
+                f"{self.name}: expected {self.status}, got "
+                f"{response.status_code} {response.get_data(as_text=True)[:200]}"
+            )
+        if self.on_response:
+            self.on_response(response.get_json())
+        return response
+
+
+def login(client, email):
+    response = client.post('/api/v1/auth/login', json={
+        'email': email, 'password': LOGIN_PASSWORD
+    })
+    return response.get_json()['access_token']
+
+
+def build_endpoints(client, ids, rng):
+    """Request templates covering every route of app/api/v1"""
+    from app import db
+    from app.models.user import User
+    from app.services import facade
+
+    admin = db.session.get(User, ids['users'][0])
+    admin.is_admin = True
+    # Reviews are posted by a user who has not reviewed anything yet
+    reviewer = facade.create_user({
+        'first_name': 'Bench', 'last_name': 'Reviewer',
+        'email': 'reviewer@bench.io', 'password': LOGIN_PASSWORD
+    })
+    db.session.commit()
+    admin_token = login(client, admin.email)
+    token = login(client, reviewer.email)
+    reviewer_id = reviewer.id
+
+    places = ids['places']
+    amenities = ids['amenities']
+    reviews = ids['reviews']
+    created = {'places': [], 'reviews': []}
+    place = places[0]
+    lat, lng = rng.uniform(-50, 50), rng.uniform(-170, 170)
+
+    return [
+        Endpoint('POST /users/', 'POST', '/api/v1/users/', status=201,
+                 body=lambda i: {
+                     'first_name': 'New', 'last_name': f'User{i}',
+                     'email': f'new{i}@bench.io', 'password': 'secret123'
+                 }),
+        Endpoint('GET /users/', 'GET', '/api/v1/users/', token=admin_token),
+        Endpoint('GET /users/<id>', 'GET', f'/api/v1/users/{reviewer_id}',
+                 token=token),
+        Endpoint('PUT /users/<id>', 'PUT', f'/api/v1/users/{reviewer_id}',
+                 token=token, body=lambda i: {'first_name': f'Bench{i}'}),
+        Endpoint('POST /auth/login', 'POST', '/api/v1/auth/login', body={
+            'email': 'reviewer@bench.io', 'password': LOGIN_PASSWORD
+        }),
+        Endpoint('GET /auth/protected', 'GET', '/api/v1/auth/protected',
+                 token=token),
+        Endpoint('POST /amenities/', 'POST', '/api/v1/amenities/',
+                 token=admin_token, status=201,
+                 body=lambda i: {'name': f'Bench amenity {i}'}),
+        Endpoint('GET /amenities/', 'GET', '/api/v1/amenities/'),
+        Endpoint('GET /amenities/<id>', 'GET',
+                 lambda i: f'/api/v1/amenities/{amenities[i % len(amenities)]}'),
+        Endpoint('PUT /amenities/<id>', 'PUT',
+                 lambda i: f'/api/v1/amenities/{amenities[i % len(amenities)]}',
+                 token=admin_token, body=lambda i: {'name': f'Renamed {i}'}),
+        Endpoint('POST /places/', 'POST', '/api/v1/places/', token=token,
+                 status=201, body=lambda i: {
+                     'title': f'Bench place {i}', 'description': 'bench',
+                     'price': 80.0, 'latitude': lat, 'longitude': lng
+                 },
+                 on_response=lambda data: created['places'].append(
+                     data['id'])),
+        Endpoint('GET /places/', 'GET', '/api/v1/places/?limit=20'),
+        Endpoint('GET /places/?min_price', 'GET',
+                 '/api/v1/places/?limit=20&min_price=100&max_price=200'),
+        Endpoint('GET /places/?bbox', 'GET',
+                 lambda i: '/api/v1/places/?bbox={},{},{},{}'.format(
+                     lat - 5, lng - 5, lat + 5, lng + 5)),
+        Endpoint('GET /places/?near', 'GET',
+                 f'/api/v1/places/?near={lat},{lng}&radius_km=300'),
+        Endpoint('GET /places/export', 'GET', '/api/v1/places/export'),
+        Endpoint('GET /places/search', 'GET',
+                 '/api/v1/places/search?q=synthetic+place&limit=20'),
+        Endpoint('GET /places/<id>', 'GET',
+                 lambda i: f'/api/v1/places/{places[i % len(places)]}'),
+        Endpoint('GET /places/<id>?fields', 'GET',
+                 lambda i: f'/api/v1/places/{places[i % len(places)]}'
+                           '?fields=title,price&include=owner'),
+        Endpoint('PUT /places/<id>', 'PUT',
+                 lambda i: f"/api/v1/places/{created['places'][i]}",
+                 token=token, body=lambda i: {'price': 90.0 + i}),
+        Endpoint('POST /reviews/', 'POST', '/api/v1/reviews/', token=token,
+                 status=201, body=lambda i: {
+                     'text': 'Bench review', 'rating': 4,
+                     'place_id': places[i]
+                 },
+                 on_response=lambda data: created['reviews'].append(
+                     data['id'])),
+        Endpoint('GET /reviews/', 'GET', '/api/v1/reviews/'),
+        Endpoint('GET /reviews/export', 'GET', '/api/v1/reviews/export'),
+        Endpoint('GET /reviews/<id>', 'GET',
+                 lambda i: f'/api/v1/reviews/{reviews[i % len(reviews)]}'),
+        Endpoint('PUT /reviews/<id>', 'PUT',
+                 lambda i: f"/api/v1/reviews/{created['reviews'][i]}",
+                 token=token, body=lambda i: {'rating': 1 + i % 5}),
+        Endpoint('GET /reviews/places/<id>/reviews', 'GET',
+                 f'/api/v1/reviews/places/{place}/reviews?limit=20'),
+        Endpoint('DELETE /reviews/<id>', 'DELETE',
+                 lambda i: f"/api/v1/reviews/{created['reviews'][i]}",
+                 token=token),
+    ]
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(client, endpoint, requests, warmup):
+    """Run warmup requests under tracemalloc, then time the others"""
+    from app.persistence.query_counter import QueryCounter
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(warmup):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            endpoint.send(client, i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    latencies, statements = [], []
+    for i in range(warmup, warmup + requests):
+        with QueryCounter() as counter:
+            start = time.perf_counter()
+            endpoint.send(client, i)
+            latencies.append(time.perf_counter() - start)
+        statements.append(counter.count)
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'statements_max': max(statements),
+        'statements_mean': round(statistics.fmean(statements), 2),
+        'alloc_peak_kib': round(statistics.median(peaks) / 1024, 1)
+        if peaks else None,
+    }
+
+
+def compare(results, baseline, args):
+    """Return the regressions of results against a baseline run"""
+    failures = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (
+                1 + args.max_latency_regression):
+            failures.append(
+                f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms"
+            )
+        if current['statements_max'] > (
+                previous['statements_max'] + args.max_statement_increase):
+            failures.append(
+                f"{name}: {previous['statements_max']} -> "
+                f"{current['statements_max']} SQL statements"
+            )
+        if (current['alloc_peak_kib'] and previous['alloc_peak_kib']
+                and current['alloc_peak_kib'] > previous['alloc_peak_kib']
+                * (1 + args.max_alloc_regression)):
+            failures.append(
+                f"{name}: allocation peak {previous['alloc_peak_kib']} -> "
+                f"{current['alloc_peak_kib']} KiB"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--places', type=int, default=2000)
+    parser.add_argument('--amenities', type=int, default=20)
+    parser.add_argument('--reviews-per-place', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=50,
+                        help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='untimed requests per endpoint, used to '
+                             'measure allocations')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline',
+                        help='JSON results of an earlier run to compare with')
+    parser.add_argument('--max-latency-regression', type=float, default=0.25,
+                        help='allowed relative p95 increase (default 0.25)')
+    parser.add_argument('--max-statement-increase', type=int, default=0,
+                        help='allowed extra SQL statements per request')
+    parser.add_argument('--max-alloc-regression', type=float, default=0.5,
+                        help='allowed relative allocation peak increase')
+    args = parser.parse_args()
+    if args.places < args.requests + args.warmup:
+        parser.error('--places must be at least --requests + --warmup')
+
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    os.environ['TEST_DATABASE_URL'] = f'sqlite:///{path}'
+    # Imported late so TestingConfig picks up the temporary database
+    from app import create_app, db
+    from app.services import facade
+    from benchmarks.common import seed
+
+    try:
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            ids = seed(
+                users=args.users, places=args.places,
+                amenities=args.amenities,
+                reviews_per_place=args.reviews_per_place,
+                rng=random.Random(0)
+            )
+            # Seeding writes the tables directly, bypassing the facade
+            facade.rebuild_search_index()
+            print(f"seeded {args.users} users, {args.places} places, "
+                  f"{args.amenities} amenities, {len(ids['reviews'])} "
+                  f"reviews in {time.perf_counter() - start:.1f}s")
+
+            client = app.test_client()
+            endpoints = build_endpoints(client, ids, random.Random(1))
+            results = {
+                'meta': {
+                    'created_at': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'users': args.users,
+                    'places': args.places,
+                    'amenities': args.amenities,
+                    'reviews': len(ids['reviews']),
+                    'requests': args.requests,
+                },
+                'endpoints': {}
+            }
+            print(f"{'endpoint':<36}{'p50':>9}{'p95':>9}{'p99':>9}"
+                  f"{'SQL':>6}{'KiB':>9}")
+            for endpoint in endpoints:
+                stats = measure(client, endpoint, args.requests, args.warmup)
+                results['endpoints'][endpoint.name] = stats
+                print(f"{endpoint.name:<36}{stats['p50_ms']:>9.2f}"
+                      f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+                      f"{stats['statements_max']:>6}"
+                      f"{stats['alloc_peak_kib']:>9.1f}")
+            db.session.remove()
+    finally:
+        os.remove(path)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    with open(args.output, 'w') as stream:
+        json.dump(results, stream, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as stream:
+            failures = compare(results, json.load(stream), args)
+        if failures:
+            print("REGRESSIONS:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"OK: no regression against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
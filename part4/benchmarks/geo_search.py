@@ -0,0 +1,136 @@
+"""Compare grid-cell indexed place search with a full table scan.
+
+Also compares the first page of a radius search ordered and limited in
+SQL with loading every place of the circle and sorting it in Python.
+
+Usage:
+    python -m benchmarks.geo_search [--places 100000] [--queries 200]
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+from app import db
+from app.models.place import Place
+from app.persistence.geo import bbox_around, grid_cell, haversine_km
+from app.services.repositories.place_repository import PlaceRepository
+from benchmarks.common import make_app, seed
+
+
+def bulk_insert_places(count, owner_id, rng):
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        latitude = rng.uniform(-60, 70)
+        longitude = rng.uniform(-180, 180)
+        rows.append({
+            'id': str(uuid.uuid4()),
+            'title': f'Place {i}',
+            'description': '',
+            'price': round(rng.uniform(10, 500), 2),
+            'latitude': latitude,
+            'longitude': longitude,
+            'grid_cell': grid_cell(latitude, longitude),
+            'owner_id': owner_id,
+            'created_at': now,
+            'updated_at': now
+        })
+    db.session.execute(Place.__table__.insert(), rows)
+    db.session.commit()
+
+
+def full_scan(south, west, north, east):
+    return Place.query.filter(
+        Place.latitude.between(south, north),
+        Place.longitude.between(west, east)
+    ).all()
+
+
+def sorted_in_python(repo, latitude, longitude, radius_km, limit):
+    """The first page of a radius search, sorted after loading every place"""
+    places = repo.get_in_bbox(*bbox_around(latitude, longitude, radius_km))
+    by_distance = sorted(
+        (haversine_km(latitude, longitude, p.latitude, p.longitude), p.id)
+        for p in places
+    )
+    return [item for item in by_distance if item[0] <= radius_km][:limit]
+
+
+def sorted_in_sql(repo, latitude, longitude, radius_km, limit):
+    """The first page of a radius search, ordered and limited in SQL"""
+    return repo.get_page_by_distance(
+        latitude, longitude, bbox_around(latitude, longitude, radius_km),
+        limit, radius_km=radius_km
+    )[0]
+
+
+def timed(func, boxes):
+    found = 0
+    start = time.perf_counter()
+    for box in boxes:
+        found += len(func(*box))
+        db.session.expunge_all()
+    return time.perf_counter() - start, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--places', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--radius-km', type=float, default=50.0)
+    parser.add_argument('--page-radius-km', type=float, default=500.0)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    app = make_app()
+    with app.app_context():
+        owner_id = seed(users=1, places=0, amenities=0)['users'][0]
+        start = time.perf_counter()
+        bulk_insert_places(args.places, owner_id, rng)
+        print(f"seeded {args.places} places in "
+              f"{time.perf_counter() - start:.1f}s")
+
+        boxes = []
+        while len(boxes) < args.queries:
+            box = bbox_around(
+                rng.uniform(-55, 65), rng.uniform(-175, 175), args.radius_km
+            )
+            if box[1] <= box[3]:
+                boxes.append(box)
+
+        repo = PlaceRepository()
+        indexed_time, indexed_found = timed(repo.get_in_bbox, boxes)
+        scan_time, scan_found = timed(full_scan, boxes)
+        assert indexed_found == scan_found, (indexed_found, scan_found)
+
+        print(f"{args.queries} bounding-box queries, "
+              f"radius {args.radius_km:g} km, {indexed_found} hits")
+        print(f"  grid-cell index: {indexed_time * 1000 / args.queries:8.2f} "
+              f"ms/query")
+        print(f"  full scan:       {scan_time * 1000 / args.queries:8.2f} "
+              f"ms/query")
+        print(f"  speedup:         {scan_time / indexed_time:8.1f}x")
+
+        centers = [
+            (rng.uniform(-55, 65), rng.uniform(-175, 175), args.page_radius_km,
+             args.limit)
+            for _ in range(args.queries)
+        ]
+        python_time, _ = timed(
+            lambda *center: sorted_in_python(repo, *center), centers
+        )
+        sql_time, _ = timed(
+            lambda *center: sorted_in_sql(repo, *center), centers
+        )
+        print(f"first {args.limit} places by distance, "
+              f"radius {args.page_radius_km:g} km")
+        print(f"  sorted in Python: {python_time * 1000 / args.queries:7.2f} "
+              f"ms/query")
+        print(f"  sorted in SQL:    {sql_time * 1000 / args.queries:7.2f} "
+              f"ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Compare InMemoryRepository lookups with and without secondary indexes.
+
+Loads the same objects into a repository without indexes and into one
+with a unique index on email, a hash index on owner_id and a sorted index
+on price, then measures get_by_attribute, find_all_by_attribute and
+find_in_range on both, and the cost the indexes add to add, update and
+delete.
+
+Usage:
+    python -m benchmarks.in_memory_indexes [--objects 1000000]
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+from app.persistence.repository import InMemoryRepository
+
+
+class Listing:
+    """Lightweight stand-in for a model: the repository only needs
+    attributes and update()"""
+
+    __slots__ = ('id', 'email', 'owner_id', 'price', 'created_at',
+                 'updated_at')
+
+    def __init__(self, email, owner_id, price):
+        self.id = str(uuid.uuid4())
+        self.email = email
+        self.owner_id = owner_id
+        self.price = price
+        self.created_at = self.updated_at = datetime.utcnow()
+
+    def update(self, data):
+        for key, value in data.items():
+            setattr(self, key, value)
+        self.updated_at = datetime.utcnow()
+
+
+def make_listings(count, owners, rng):
+    owner_ids = [str(uuid.uuid4()) for _ in range(owners)]
+    return [
+        Listing(f'user{i}@bench.io', rng.choice(owner_ids),
+                round(rng.uniform(10, 1000), 2))
+        for i in range(count)
+    ], owner_ids
+
+
+def rate(func, args_list, budget=2.0):
+    """Calls per second of func over args_list, stopping after budget s"""
+    start = time.perf_counter()
+    calls = 0
+    for args in args_list:
+        func(*args)
+        calls += 1
+        if time.perf_counter() - start > budget:
+            break
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--objects', type=int, default=1000000)
+    parser.add_argument('--owners', type=int, default=10000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    listings, owner_ids = make_listings(args.objects, args.owners, rng)
+
+    plain = InMemoryRepository()
+    indexed = InMemoryRepository(indexed_attributes=('owner_id',),
+                                 unique_attributes=('email',),
+                                 sorted_attributes=('price',))
+    for name, repo in (('plain', plain), ('indexed', indexed)):
+        start = time.perf_counter()
+        repo.add_all(listings)
+        print(f"add_all {name:<8} {args.objects:,} objects in "
+              f"{time.perf_counter() - start:.2f}s")
+
+    emails = [('email', rng.choice(listings).email)
+              for _ in range(args.lookups)]
+    owners = [('owner_id', rng.choice(owner_ids))
+              for _ in range(args.lookups)]
+    lows = [rng.uniform(10, 999) for _ in range(args.lookups)]
+    ranges = [('price', low, low + 1) for low in lows]
+    cases = [
+        ('get_by_attribute(email)', 'get_by_attribute', emails),
+        ('find_all_by_attribute(owner_id)', 'find_all_by_attribute', owners),
+        ('find_in_range(price, 1 wide)', 'find_in_range', ranges),
+    ]
+    for label, method, args_list in cases:
+        scan = rate(getattr(plain, method), args_list)
+        index = rate(getattr(indexed, method), args_list)
+        print(f"{label:<32} scan {scan:>10,.1f}/s  index {index:>12,.0f}/s  "
+              f"{index / scan:,.0f}x")
+
+    # Write overhead of keeping the three indexes up to date. Both
+    # repositories hold the same objects, so the indexed one goes first:
+    # an update through the plain one would change values under its index
+    new = [(Listing(f'new{i}@bench.io', rng.choice(owner_ids),
+                    round(rng.uniform(10, 1000), 2)),)
+           for i in range(args.lookups)]
+    updates = [(obj.id, {'owner_id': rng.choice(owner_ids),
+                         'price': round(rng.uniform(10, 1000), 2)})
+               for obj in rng.sample(listings, args.lookups)]
+    deletes = [(obj.id,) for obj in rng.sample(listings, args.lookups)]
+    for label, method, args_list in (('add', 'add', new),
+                                     ('update', 'update', updates),
+                                     ('delete', 'delete', deletes)):
+        indexed_rate = rate(getattr(indexed, method), args_list)
+        plain_rate = rate(getattr(plain, method), args_list)
+        print(f"{label:<32} plain {plain_rate:>9,.0f}/s  "
+              f"indexed {indexed_rate:>10,.0f}/s")
+
+
+if __name__ == '__main__':
+    main()
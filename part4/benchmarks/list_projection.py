@@ -0,0 +1,114 @@
+"""Compare projection-built list responses with ORM hydration.
+
+For the place and review lists, times the ORM path (load model objects,
+then call to_summary_dict/to_dict) against the projection path (select
+the columns, build the dicts from row tuples) and measures the peak
+memory of each with tracemalloc.
+
+Usage:
+    python -m benchmarks.list_projection [--rows 100000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from app import db
+from app.models.review import Review
+from app.services import facade
+from app.services.facade import PLACE_SUMMARY_LOAD
+from benchmarks.common import make_app, seed
+from benchmarks.geo_search import bulk_insert_places
+
+
+def bulk_insert_reviews(place_ids, user_id, rng):
+    now = datetime.utcnow()
+    db.session.execute(Review.__table__.insert(), [{
+        'id': str(uuid.uuid4()),
+        'text': f'Review {i}',
+        'rating': rng.randint(1, 5),
+        'user_id': user_id,
+        'place_id': place_id,
+        'created_at': now,
+        'updated_at': now
+    } for i, place_id in enumerate(place_ids)])
+    db.session.commit()
+
+
+def orm_places():
+    places = facade.place_repo.get_all(load=PLACE_SUMMARY_LOAD)
+    return [place.to_summary_dict() for place in places]
+
+
+def orm_reviews():
+    return [review.to_dict() for review in facade.review_repo.get_all()]
+
+
+def run(func):
+    result = func()
+    # Drop the identity map so every run hydrates from scratch
+    db.session.expunge_all()
+    return len(result)
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = run(func)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        run(func)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    app = make_app()
+    with app.app_context():
+        owner_id = seed(users=1, places=0, amenities=0)['users'][0]
+        start = time.perf_counter()
+        bulk_insert_places(args.rows, owner_id, rng)
+        place_ids = [row['id'] for row in
+                     facade.place_repo.get_rows(('id',))]
+        bulk_insert_reviews(place_ids, owner_id, rng)
+        print(f"seeded {args.rows} places and {args.rows} reviews in "
+              f"{time.perf_counter() - start:.1f}s")
+
+        cases = [
+            ('places', orm_places, facade.get_all_places),
+            ('reviews', orm_reviews, facade.list_reviews),
+        ]
+        for name, orm_path, projection_path in cases:
+            print(f"{name}:")
+            results = {}
+            for label, func in (('ORM', orm_path),
+                                ('projection', projection_path)):
+                elapsed, count = best_time(func, args.repeat)
+                assert count == args.rows, (label, count)
+                peak = peak_memory(func)
+                results[label] = (elapsed, peak)
+                print(f"  {label:<10} {count / elapsed:>10,.0f} objects/s "
+                      f"{peak / 2 ** 20:>8.1f} MiB peak")
+            orm_time, orm_peak = results['ORM']
+            projection_time, projection_peak = results['projection']
+            print(f"  speedup {orm_time / projection_time:.1f}x, "
+                  f"memory {orm_peak / projection_peak:.1f}x lower")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Check that place reads run a constant number of SQL statements.
+
+Seeds the database in several steps and counts the statements issued by
+the listing and detail reads after each step. Any growth with the number
+of rows means an N+1 lookup has crept back in.
+"""
+import sys
+from app import db
+from app.persistence.query_counter import QueryCounter
+from app.services import facade
+from benchmarks.common import make_app, seed
+
+
+def count_statements(func, *args, **kwargs):
+    db.session.expire_all()
+    with QueryCounter() as counter:
+        func(*args, **kwargs)
+    return counter.count
+
+
+def main():
+    app = make_app()
+    results = {}
+    with app.app_context():
+        for step in (10, 100, 1000):
+            ids = seed(users=20, places=step, reviews_per_place=5)
+            place_id = ids['places'][0]
+            results[step] = {
+                'get_all_places': count_statements(facade.get_all_places),
+                'get_places_page': count_statements(
+                    facade.get_places_page, 20
+                ),
+                'get_place_by_id': count_statements(
+                    facade.get_place_by_id, place_id
+                ),
+            }
+            print(f"{step:>5} new places: {results[step]}")
+
+    failed = False
+    for name in results[10]:
+        counts = {step: result[name] for step, result in results.items()}
+        if len(set(counts.values())) != 1:
+            print(f"FAIL {name}: statement count grows with rows {counts}")
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("OK: statement counts are independent of the result size")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Measure login throughput and its impact on other endpoints.
+
+A pool of client threads logs in continuously while one more thread
+polls GET /api/v1/amenities/. The run is repeated without a bound on
+concurrent bcrypt jobs (0 workers) and with increasing bounds; logins
+turned away with a 503 by the full queue are counted apart.
+
+Usage:
+    python -m benchmarks.login_throughput [--clients 8] [--seconds 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from app import db
+from app.hashing import _hash_password
+from app.models.user import User
+from benchmarks.common import BenchmarkConfig, make_app
+
+
+def run(workers, rounds, clients, seconds, max_queue):
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+
+    class Config(BenchmarkConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        BCRYPT_LOG_ROUNDS = rounds
+        PASSWORD_HASH_WORKERS = workers
+        PASSWORD_HASH_MAX_QUEUE = max_queue
+        # A login holds its connection while bcrypt runs: size the pool so
+        # that the hasher, not the pool, is what limits the clients
+        DB_POOL_SIZE = clients + 1
+        DB_MAX_OVERFLOW = 0
+
+    app = make_app(Config)
+    with app.app_context():
+        user = User('Bench', 'User', 'bench@hbnb.io')
+        user.password = _hash_password('password', rounds)
+        db.session.add(user)
+        db.session.commit()
+
+    stop = threading.Event()
+    logins = []
+    rejected = []
+    probe_latencies = []
+
+    def login():
+        client = app.test_client()
+        while not stop.is_set():
+            response = client.post('/api/v1/auth/login', json={
+                'email': 'bench@hbnb.io', 'password': 'password'
+            })
+            if response.status_code == 503:
+                rejected.append(1)
+                stop.wait(int(response.headers['Retry-After']))
+                continue
+            assert response.status_code == 200, response.get_json()
+            logins.append(1)
+
+    def probe():
+        client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get('/api/v1/amenities/')
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login) for _ in range(clients)]
+    threads.append(threading.Thread(target=probe))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    os.unlink(path)
+
+    probe_latencies.sort()
+    return {
+        'logins_per_sec': len(logins) / seconds,
+        'rejected_per_sec': len(rejected) / seconds,
+        'probe_p50_ms': statistics.median(probe_latencies) * 1000,
+        'probe_p95_ms':
+            probe_latencies[int(len(probe_latencies) * 0.95)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--max-queue', type=int, default=2)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[0, 1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    print(f"{args.clients} login clients, bcrypt cost {args.rounds}, "
+          f"queue of {args.max_queue}, {os.cpu_count()} CPUs")
+    for workers in dict.fromkeys(args.workers):
+        result = run(workers, args.rounds, args.clients, args.seconds,
+                     args.max_queue)
+        print(f"  workers={workers:<3} "
+              f"logins/s={result['logins_per_sec']:7.1f}  "
+              f"503/s={result['rejected_per_sec']:7.1f}  "
+              f"amenities p50={result['probe_p50_ms']:7.1f} ms  "
+              f"p95={result['probe_p95_ms']:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
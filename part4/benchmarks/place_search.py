@@ -0,0 +1,169 @@
+"""Compare the place search indexes with a LIKE scan.
+
+Inserts places with generated titles, descriptions and one review each,
+drawn from a vocabulary with Zipf-distributed word frequencies, builds
+the FTS5 index and the in-memory inverted index, then times queries of
+one and two words on both and on the equivalent LIKE '%word%' scan, and
+the cost the index adds to a review write.
+
+Usage:
+    python -m benchmarks.place_search [--places 100000] [--queries 200]
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+from itertools import accumulate
+from sqlalchemy import and_, bindparam, or_, select
+from app import db
+from app.models.place import Place
+from app.models.review import Review
+from app.persistence.search import InMemorySearchIndex
+from app.services import facade
+from benchmarks.common import make_app, seed
+from benchmarks.geo_search import bulk_insert_places
+
+SYLLABLES = ('ba', 'ko', 'ri', 'mu', 'te', 'sa', 'lo', 'vi', 'ne', 'du')
+VOCABULARY_SIZE = 20000
+# Queried words: frequent enough to match, rare enough to be useful
+QUERY_RANKS = range(50, 2000)
+
+
+def make_vocabulary(size):
+    words = []
+    for i in range(size):
+        syllables = []
+        while True:
+            i, digit = divmod(i, len(SYLLABLES))
+            syllables.append(SYLLABLES[digit])
+            if not i:
+                break
+        words.append('x' + ''.join(syllables))
+    return words
+
+
+WORDS = make_vocabulary(VOCABULARY_SIZE)
+CUMULATIVE_WEIGHTS = list(accumulate(
+    1 / rank for rank in range(1, VOCABULARY_SIZE + 1)
+))
+
+
+def sentence(rng, length):
+    return ' '.join(
+        rng.choices(WORDS, cum_weights=CUMULATIVE_WEIGHTS, k=length)
+    )
+
+
+class NoIndex:
+    """Search index that indexes nothing, the write path without search"""
+
+    def index(self, place_id, title, description, reviews):
+        pass
+
+
+def fill_text(rng, user_ids):
+    """Give every place a title, a description and one review"""
+    places = Place.__table__
+    place_ids = db.session.execute(select(places.c.id)).scalars().all()
+    db.session.execute(places.update().where(
+        places.c.id == bindparam('place_id')
+    ), [{'place_id': place_id, 'title': sentence(rng, 3),
+         'description': sentence(rng, 20)} for place_id in place_ids])
+    now = datetime.utcnow()
+    db.session.execute(Review.__table__.insert(), [{
+        'id': str(uuid.uuid4()), 'text': sentence(rng, 12),
+        'rating': rng.randint(1, 5), 'user_id': rng.choice(user_ids),
+        'place_id': place_id, 'created_at': now, 'updated_at': now
+    } for place_id in place_ids])
+    db.session.commit()
+    return place_ids
+
+
+def like_scan(terms, limit):
+    """Places whose title, description or a review contains every term"""
+    reviewed = db.session.query(Review.place_id)
+    conditions = [
+        or_(Place.title.like(f'%{term}%'),
+            Place.description.like(f'%{term}%'),
+            Place.id.in_(reviewed.filter(Review.text.like(f'%{term}%'))))
+        for term in terms
+    ]
+    return db.session.query(Place.id).filter(and_(*conditions)) \
+        .limit(limit).all()
+
+
+def per_second(func, queries):
+    start = time.perf_counter()
+    for terms in queries:
+        func(terms)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--places', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    app = make_app()
+    with app.app_context():
+        user_ids = seed(users=50, places=0, amenities=0)['users']
+        start = time.perf_counter()
+        bulk_insert_places(args.places, user_ids[0], rng)
+        place_ids = fill_text(rng, user_ids)
+        print(f"seeded {args.places} places and reviews in "
+              f"{time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        facade.rebuild_search_index()
+        print(f"FTS5 index built in {time.perf_counter() - start:.1f}s")
+        memory = InMemorySearchIndex()
+        start = time.perf_counter()
+        memory.search(['cozy'], 1)
+        print(f"in-memory index built in "
+              f"{time.perf_counter() - start:.1f}s")
+
+        fts = facade.search_index
+        for size in (1, 2):
+            queries = [
+                [WORDS[rank] for rank in rng.sample(QUERY_RANKS, size)]
+                for _ in range(args.queries)
+            ]
+            scan_queries = queries[:max(args.queries // 20, 1)]
+            results = {
+                'LIKE scan': per_second(
+                    lambda terms: like_scan(terms, args.limit), scan_queries
+                ),
+                'FTS5': per_second(
+                    lambda terms: fts.search(terms, args.limit), queries
+                ),
+                'in-memory': per_second(
+                    lambda terms: memory.search(terms, args.limit), queries
+                ),
+            }
+            print(f"{size} word queries: " + ', '.join(
+                f"{name} {rate:,.1f}/s" for name, rate in results.items()
+            ))
+
+        # Index maintenance on the write path
+        for label, index in (('no index', NoIndex()), ('FTS5', fts)):
+            facade.search_index = index
+            reviewers = seed(users=200, places=0, amenities=0)['users']
+            targets = rng.sample(place_ids, len(reviewers))
+            start = time.perf_counter()
+            for user_id, place_id in zip(reviewers, targets):
+                facade.create_review({
+                    'user_id': user_id, 'place_id': place_id,
+                    'text': sentence(rng, 12), 'rating': 4
+                })
+            elapsed = time.perf_counter() - start
+            print(f"create_review, {label}: "
+                  f"{len(reviewers) / elapsed:,.0f}/s")
+        facade.search_index = fts
+
+
+if __name__ == '__main__':
+    main()
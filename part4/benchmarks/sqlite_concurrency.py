@@ -0,0 +1,119 @@
+"""Compare SQLite with default settings and with the tuned engine profile.
+
+Writer threads insert places, one commit each, while reader threads page
+through GET /api/v1/places/. Each profile runs against a fresh database
+file and reports throughput, read latency and "database is locked" errors.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency [--readers 8] [--writers 2]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models.place import Place
+from benchmarks.common import BenchmarkConfig, make_app, seed
+from config import Config
+
+PROFILES = {
+    # sqlite3 module defaults: rollback journal, synchronous=FULL
+    'default': {},
+    'tuned': Config.SQLITE_PRAGMAS,
+}
+
+
+def run(pragmas, readers, writers, seconds):
+    directory = tempfile.mkdtemp()
+
+    class ProfileConfig(BenchmarkConfig):
+        SQLALCHEMY_DATABASE_URI = (
+            f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        )
+        SQLITE_PRAGMAS = pragmas
+        DB_POOL_SIZE = readers + writers
+
+    app = make_app(ProfileConfig)
+    with app.app_context():
+        owner_id = seed(users=1, places=200)['users'][0]
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+
+    def writer(number):
+        rng = random.Random(number)
+        with app.app_context():
+            while not stop.is_set():
+                db.session.add(Place(
+                    title='Concurrent place', description='',
+                    price=rng.uniform(10, 500), latitude=0.0,
+                    longitude=0.0, owner_id=owner_id
+                ))
+                try:
+                    db.session.commit()
+                    with lock:
+                        stats['writes'] += 1
+                except OperationalError:
+                    db.session.rollback()
+                    with lock:
+                        stats['locked'] += 1
+
+    def reader():
+        client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = client.get('/api/v1/places/?limit=20')
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status_code == 200:
+                    stats['reads'] += 1
+                    stats['latencies'].append(elapsed)
+                else:
+                    stats['locked'] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,))
+               for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(directory)
+
+    latencies = sorted(stats['latencies']) or [0.0]
+    return {
+        'reads_per_sec': stats['reads'] / seconds,
+        'writes_per_sec': stats['writes'] / seconds,
+        'read_p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'locked_errors': stats['locked'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, "
+          f"{args.seconds:g}s per profile")
+    for name, pragmas in PROFILES.items():
+        result = run(pragmas, args.readers, args.writers, args.seconds)
+        print(f"  {name:<8} reads/s={result['reads_per_sec']:8.1f}  "
+              f"writes/s={result['writes_per_sec']:8.1f}  "
+              f"read p95={result['read_p95_ms']:7.1f} ms  "
+              f"locked={result['locked_errors']}")
+
+
+if __name__ == '__main__':
+    main()
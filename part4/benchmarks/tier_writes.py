@@ -0,0 +1,103 @@
+"""Measure API writes through write-through and write-behind tiers.
+
+Amenities and reviews are served from a repository tier in each
+consistency mode in turn. Every round creates an amenity and a review
+through the API, updates both and reads them back; an unexpected status
+or a stale read stops the run. Once the write-behind queues are flushed
+the database must hold the updated rows.
+
+Usage:
+    python -m benchmarks.tier_writes [--rounds 200]
+"""
+import argparse
+import time
+from app import db
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.persistence.tiered import WRITE_BEHIND, WRITE_THROUGH
+from app.services import facade
+from benchmarks.common import make_app, seed
+
+
+def expect(response, status):
+    assert response.status_code == status, (
+        response.status_code, response.get_json()
+    )
+    return response.get_json()
+
+
+def run(consistency, rounds):
+    # The endpoints use the facade singleton: give it the tiers to measure
+    facade.__init__(tiers={'amenity': consistency, 'review': consistency})
+    app = make_app()
+    with app.app_context():
+        ids = seed(users=2, places=rounds, amenities=0)
+        owner_id, reviewer_id = ids['users']
+        Place.query.update({Place.owner_id: owner_id})
+        User.query.filter_by(id=owner_id).update({User.is_admin: True})
+        db.session.commit()
+        owner_email = db.session.get(User, owner_id).email
+        reviewer_email = db.session.get(User, reviewer_id).email
+
+    client = app.test_client()
+
+    def login(email):
+        token = expect(client.post('/api/v1/auth/login', json={
+            'email': email, 'password': 'password'
+        }), 200)['access_token']
+        return {'Authorization': f'Bearer {token}'}
+
+    admin, reviewer = login(owner_email), login(reviewer_email)
+    amenity_ids, review_ids = [], []
+    start = time.perf_counter()
+    for i, place_id in enumerate(ids['places']):
+        amenity_id = expect(client.post(
+            '/api/v1/amenities/', json={'name': f'Amenity {i}'},
+            headers=admin
+        ), 201)['id']
+        expect(client.put(
+            f'/api/v1/amenities/{amenity_id}',
+            json={'name': f'Renamed {i}'}, headers=admin
+        ), 200)
+        review_id = expect(client.post('/api/v1/reviews/', json={
+            'text': 'Fine', 'rating': 3, 'place_id': place_id
+        }, headers=reviewer), 201)['id']
+        expect(client.put(
+            f'/api/v1/reviews/{review_id}',
+            json={'text': 'Great', 'rating': 5}, headers=reviewer
+        ), 200)
+        assert expect(client.get(f'/api/v1/amenities/{amenity_id}'),
+                      200)['name'] == f'Renamed {i}'
+        assert expect(client.get(f'/api/v1/reviews/{review_id}'),
+                      200)['text'] == 'Great'
+        amenity_ids.append(amenity_id)
+        review_ids.append(review_id)
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        for repo in facade.tiers:
+            repo.flush()
+        db.session.commit()
+        names = dict(db.session.query(Amenity.id, Amenity.name))
+        texts = dict(db.session.query(Review.id, Review.text))
+    assert all(names[amenity_id] == f'Renamed {i}'
+               for i, amenity_id in enumerate(amenity_ids))
+    assert all(texts[review_id] == 'Great' for review_id in review_ids)
+    return rounds * 6 / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.rounds} rounds of 4 writes and 2 reads")
+    for consistency in (WRITE_THROUGH, WRITE_BEHIND):
+        rate = run(consistency, args.rounds)
+        print(f"  {consistency:<14} requests/s={rate:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,77 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
 
+    # Connection pool of server databases (ignored by in-memory SQLite)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = True
+
+    # PRAGMAs run on each new SQLite connection: WAL lets readers proceed
+    # while a writer commits, busy_timeout (ms) waits for the write lock
+    # instead of failing with "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -16000,
+    }
+
+    # Seconds a user's privilege record is trusted before being reloaded
+    IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 30))
+
+    # bcrypt cost of new password hashes; stored hashes with another cost
+    # are upgraded at the next successful login
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    # bcrypt jobs running at once, 0 for no limit; up to
+    # PASSWORD_HASH_MAX_QUEUE more wait for PASSWORD_HASH_TIMEOUT seconds at
+    # most, other logins and password changes are answered with a 503
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 8))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+
+    # Opt-in per-request timing: Server-Timing header and one JSON log line
+    # per request; requests running more SQL statements than the budget
+    # are logged as warnings
+    REQUEST_INSTRUMENTATION = os.getenv(
+        'REQUEST_INSTRUMENTATION', ''
+    ).lower() in ('1', 'true', 'yes')
+    SQL_STATEMENT_BUDGET = int(os.getenv('SQL_STATEMENT_BUDGET', 20))
+
+    # Statements slower than this many milliseconds are logged with their
+    # query plan; an empty value disables the slow-query log
+    SLOW_QUERY_THRESHOLD_MS = (
+        float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+        if os.getenv('SLOW_QUERY_THRESHOLD_MS', '200') else None
+    )
+
+    # Prometheus metrics of each worker process, served at /metrics
+    METRICS_ENABLED = os.getenv(
+        'METRICS_ENABLED', 'true'
+    ).lower() in ('1', 'true', 'yes')
+
+    # In-process tiers in front of the repositories chosen in
+    # HBnBFacade.__init__: seconds between checks against the database for
+    # changes made by other processes, and when write-behind tiers flush
+    # their queued writes (queue length, age of the oldest write in seconds)
+    REPOSITORY_TIER_TTL = float(os.getenv('REPOSITORY_TIER_TTL', 60))
+    WRITE_BEHIND_FLUSH_SIZE = int(os.getenv('WRITE_BEHIND_FLUSH_SIZE', 100))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(
+        os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 5)
+    )
+
+    # Rows inserted per executemany batch by "flask hbnb import"
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+
+    # Read-through cache of place detail responses: 'memory', 'redis' or
+    # 'none'
+    PLACE_CACHE_BACKEND = os.getenv('PLACE_CACHE_BACKEND', 'memory')
+    PLACE_CACHE_TTL = int(os.getenv('PLACE_CACHE_TTL', 300))
+    PLACE_CACHE_MAX_ENTRIES = 1024
+    PLACE_CACHE_REDIS_URL = os.getenv(
+        'PLACE_CACHE_REDIS_URL', 'redis://localhost:6379/0'
+    )
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -18,7 +89,13 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     DEBUG = True
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///testing.db'
+    DB_POOL_SIZE = 2
+    DB_MAX_OVERFLOW = 2
+    BCRYPT_LOG_ROUNDS = 4
+    PASSWORD_HASH_WORKERS = 0
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        'TEST_DATABASE_URL', 'sqlite:///testing.db'
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 
@@ -27,6 +104,13 @@ class ProductionConfig(Config):
         'DATABASE_URL', 'sqlite:///production.db'
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    SQLITE_PRAGMAS = {
+        **Config.SQLITE_PRAGMAS,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+    }
 
 
 config = {
@@ -6,6 +6,7 @@ CREATE TABLE IF NOT EXISTS users (
     email VARCHAR(255) UNIQUE NOT NULL,
     password VARCHAR(255) NOT NULL,
     is_admin BOOLEAN DEFAULT FALSE,
+    privileges_changed_at TIMESTAMP NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
@@ -18,12 +19,33 @@ CREATE TABLE IF NOT EXISTS places (
     price DECIMAL(10, 2) NOT NULL,
     latitude FLOAT NOT NULL,
     longitude FLOAT NOT NULL,
+    grid_cell INTEGER,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
     owner_id CHAR(36) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (owner_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Keyset pagination order of the place listing
+CREATE INDEX IF NOT EXISTS ix_places_created_at_id ON places (created_at, id);
+
+-- Price range filter of the place listing
+CREATE INDEX IF NOT EXISTS ix_places_price ON places (price);
+
+-- Spatial search: index of the 1-degree grid cell holding each place
+CREATE INDEX IF NOT EXISTS ix_places_grid_cell ON places (grid_cell);
+
+-- Places of one owner (cache invalidation, ownership lookups)
+CREATE INDEX IF NOT EXISTS ix_places_owner_id ON places (owner_id);
+
+-- Place listing sorted by average rating (sort=rating)
+CREATE INDEX IF NOT EXISTS ix_places_rating_id ON places (
+    coalesce(CAST(rating_sum AS FLOAT) / (nullif(review_count, 0) + 0.0), 0),
+    id
+);
+
 -- Create Amenity table
 CREATE TABLE IF NOT EXISTS amenities (
     id CHAR(36) PRIMARY KEY,
@@ -46,6 +68,10 @@ CREATE TABLE IF NOT EXISTS reviews (
     UNIQUE (user_id, place_id) -- Ensure a user can only review a place once
 );
 
+-- Reviews of one place, in pagination order
+CREATE INDEX IF NOT EXISTS ix_reviews_place_id_created_at
+    ON reviews (place_id, created_at, id);
+
 -- Create Place_Amenity table (many-to-many relationship)
 CREATE TABLE IF NOT EXISTS place_amenity (
     place_id CHAR(36) NOT NULL,
@@ -54,3 +80,38 @@ CREATE TABLE IF NOT EXISTS place_amenity (
     FOREIGN KEY (place_id) REFERENCES places(id) ON DELETE CASCADE,
     FOREIGN KEY (amenity_id) REFERENCES amenities(id) ON DELETE CASCADE
 );
+
+-- One full-text search document per place: its title, description and the
+-- text of its reviews, maintained by the facade
+CREATE TABLE IF NOT EXISTS place_search_documents (
+    id INTEGER PRIMARY KEY,
+    place_id CHAR(36) NOT NULL UNIQUE,
+    title TEXT,
+    description TEXT,
+    reviews TEXT,
+    FOREIGN KEY (place_id) REFERENCES places(id) ON DELETE CASCADE
+);
+
+-- SQLite only: FTS5 index over the documents, kept in step by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS place_search USING fts5(
+    title, description, reviews,
+    content='place_search_documents', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS place_search_ai
+AFTER INSERT ON place_search_documents BEGIN
+    INSERT INTO place_search (rowid, title, description, reviews)
+    VALUES (new.id, new.title, new.description, new.reviews);
+END;
+CREATE TRIGGER IF NOT EXISTS place_search_ad
+AFTER DELETE ON place_search_documents BEGIN
+    INSERT INTO place_search (place_search, rowid, title, description, reviews)
+    VALUES ('delete', old.id, old.title, old.description, old.reviews);
+END;
+CREATE TRIGGER IF NOT EXISTS place_search_au
+AFTER UPDATE ON place_search_documents BEGIN
+    INSERT INTO place_search (place_search, rowid, title, description, reviews)
+    VALUES ('delete', old.id, old.title, old.description, old.reviews);
+    INSERT INTO place_search (rowid, title, description, reviews)
+    VALUES (new.id, new.title, new.description, new.reviews);
+END;
@@ -0,0 +1,93 @@
+-- Bring a database created from an earlier version of the models up to date.
+-- Statements are listed in the order the schema changes were introduced;
+-- run the ones that are newer than your database.
+
+-- Keyset pagination order of the place listing
+CREATE INDEX IF NOT EXISTS ix_places_created_at_id ON places (created_at, id);
+
+-- Price range filter of the place listing
+CREATE INDEX IF NOT EXISTS ix_places_price ON places (price);
+
+-- Spatial search: index of the 1-degree grid cell holding each place,
+-- computed as row * 360 + column with row = floor(latitude + 90) and
+-- column = floor(longitude + 180), clamped to the last row and column
+ALTER TABLE places ADD COLUMN grid_cell INTEGER;
+UPDATE places SET grid_cell =
+    MIN(CAST(latitude + 90 AS INTEGER), 179) * 360
+    + MIN(CAST(longitude + 180 AS INTEGER), 359);
+CREATE INDEX IF NOT EXISTS ix_places_grid_cell ON places (grid_cell);
+
+-- Denormalized review aggregates of each place; the UPDATE is the same
+-- repair run by `flask hbnb recompute-ratings`
+ALTER TABLE places ADD COLUMN review_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE places ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0;
+UPDATE places SET
+    review_count = (SELECT COUNT(*) FROM reviews
+                    WHERE reviews.place_id = places.id),
+    rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews
+                  WHERE reviews.place_id = places.id);
+
+-- Reviews of one place, in pagination order
+CREATE INDEX IF NOT EXISTS ix_reviews_place_id_created_at
+    ON reviews (place_id, created_at, id);
+
+-- One review per user and place, as declared by the Review model; SQLite
+-- cannot add a table constraint afterwards, a unique index is equivalent
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reviews_user_place
+    ON reviews (user_id, place_id);
+
+-- Moment of the last is_admin change, JWTs issued earlier are revalidated
+ALTER TABLE users ADD COLUMN privileges_changed_at DATETIME;
+
+-- Places of one owner, found by a full scan until now
+CREATE INDEX IF NOT EXISTS ix_places_owner_id ON places (owner_id);
+
+-- One full-text search document per place: its title, description and the
+-- text of its reviews, maintained by the facade
+CREATE TABLE IF NOT EXISTS place_search_documents (
+    id INTEGER PRIMARY KEY,
+    place_id CHAR(36) NOT NULL UNIQUE,
+    title TEXT,
+    description TEXT,
+    reviews TEXT,
+    FOREIGN KEY (place_id) REFERENCES places(id) ON DELETE CASCADE
+);
+
+-- SQLite only: FTS5 index over the documents, kept in step by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS place_search USING fts5(
+    title, description, reviews,
+    content='place_search_documents', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS place_search_ai
+AFTER INSERT ON place_search_documents BEGIN
+    INSERT INTO place_search (rowid, title, description, reviews)
+    VALUES (new.id, new.title, new.description, new.reviews);
+END;
+CREATE TRIGGER IF NOT EXISTS place_search_ad
+AFTER DELETE ON place_search_documents BEGIN
+    INSERT INTO place_search (place_search, rowid, title, description, reviews)
+    VALUES ('delete', old.id, old.title, old.description, old.reviews);
+END;
+CREATE TRIGGER IF NOT EXISTS place_search_au
+AFTER UPDATE ON place_search_documents BEGIN
+    INSERT INTO place_search (place_search, rowid, title, description, reviews)
+    VALUES ('delete', old.id, old.title, old.description, old.reviews);
+    INSERT INTO place_search (rowid, title, description, reviews)
+    VALUES (new.id, new.title, new.description, new.reviews);
+END;
+-- Documents of the existing places, the same rebuild as
+-- `flask hbnb reindex-search`
+INSERT INTO place_search_documents (place_id, title, description, reviews)
+SELECT p.id, p.title, p.description,
+       (SELECT group_concat(r.text, char(10)) FROM reviews r
+        WHERE r.place_id = p.id)
+FROM places p
+WHERE p.id NOT IN (SELECT place_id FROM place_search_documents);
+
+-- Place listing sorted by average rating (sort=rating); the expression
+-- must stay identical to Place RATING_KEY for queries to use the index
+CREATE INDEX IF NOT EXISTS ix_places_rating_id ON places (
+    coalesce(CAST(rating_sum AS FLOAT) / (nullif(review_count, 0) + 0.0), 0),
+    id
+);
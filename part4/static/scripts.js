@@ -61,9 +61,13 @@ function checkAuthenticationIndex() {
     }
 }
 
-async function fetchPlaces(token) {
+async function fetchPlaces(token, cursor = null) {
     try {
-        const response = await fetch('http://127.0.0.1:5000/api/v1/places', {
+        const params = new URLSearchParams();
+        if (cursor) params.set('cursor', cursor);
+        const maxPrice = getSelectedMaxPrice();
+        if (maxPrice !== null) params.set('max_price', maxPrice);
+        const response = await fetch(`http://127.0.0.1:5000/api/v1/places/?${params}`, {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -71,8 +75,9 @@ async function fetchPlaces(token) {
             }
         });
         if (response.ok) {
-            const places = await response.json();
-            displayPlaces(places);
+            const page = await response.json();
+            displayPlaces(page.places, cursor !== null);
+            setupLoadMore(token, page.next_cursor);
         } else {
             console.error("Erreur récupération lieux:", response.statusText);
         }
@@ -81,9 +86,9 @@ async function fetchPlaces(token) {
     }
 }
 
-function displayPlaces(places) {
+function displayPlaces(places, append = false) {
     const placesList = document.getElementById('places-list');
-    placesList.innerHTML = "";
+    if (!append) placesList.innerHTML = "";
     places.forEach(place => {
         const card = document.createElement('div');
         card.className = 'place-card';
@@ -91,26 +96,32 @@ function displayPlaces(places) {
             <h3>${place.title || 'Titre non renseigné'}</h3>
             <p>${place.description || 'Pas de description disponible'}</p>
             <p class="price">Prix par nuit : ${place.price ?? 'Non défini'}€</p>
+            <p class="rating">${place.avg_rating ? `★ ${place.avg_rating} (${place.review_count} avis)` : 'Pas encore d’avis'}</p>
             <a href="/place/${place.id}" class="details-button">Voir les détails</a>
         `;
-        card.dataset.price = place.price ?? 0;
         placesList.appendChild(card);
     });
 }
 
-function filterPlaces(maxPrice) {
-    const cards = document.querySelectorAll('.place-card');
-    cards.forEach(card => {
-        const price = parseFloat(card.dataset.price);
-        card.style.display = (maxPrice === "All" || price <= parseFloat(maxPrice)) ? 'block' : 'none';
-    });
+function setupLoadMore(token, nextCursor) {
+    const loadMore = document.getElementById('load-more');
+    if (!loadMore) return;
+    loadMore.style.display = nextCursor ? 'inline-block' : 'none';
+    loadMore.onclick = () => fetchPlaces(token, nextCursor);
+}
+
+function getSelectedMaxPrice() {
+    const priceFilter = document.getElementById('price-filter');
+    if (!priceFilter || priceFilter.value === "All") return null;
+    return priceFilter.value;
 }
 
 function setupPriceFilter() {
     const priceFilter = document.getElementById('price-filter');
     if (priceFilter) {
-        priceFilter.addEventListener('change', (event) => {
-            filterPlaces(event.target.value);
+        priceFilter.addEventListener('change', () => {
+            const token = getCookie('token');
+            if (token) fetchPlaces(token);
         });
     }
 }